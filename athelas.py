@@ -1,10 +1,22 @@
 import streamlit as st
-import sqlite3
+from athelas_data import (
+    DB_FILE, TEAMS, PROJECT_TYPES, STATUS_OPTIONS, PROJECT_STATUS_OPTIONS, HEALTH_COLORS, ISSUE_TYPES, SOURCE_CATEGORIES, WORKAROUND_OPTIONS,
+    INCIDENT_IMPORT_COLUMNS, INCIDENT_GRID_COLUMNS, INCIDENT_AGING_GROUPS, INCIDENT_SLA_DAYS, ANALYTICS_BURN_WINDOW_DAYS, EXPORTS, PERF_N_PLUS_ONE,
+    ensure_db, explain_query_plans, rebuild_time_rollups, get_perf, get_query_cache, get_lookup, safe_date,
+    get_users, get_user, create_user, update_user, delete_user, delete_records,
+    get_projects, get_project, create_project, update_project, delete_project, preview_project_code, get_member_projects,
+    get_project_history, get_project_history_types, normalize_project_import, diff_project_import, apply_project_import,
+    get_milestones, upsert_milestone, delete_milestone, get_latest_status_report, get_latest_status_reports, create_status_report, add_status_update,
+    status_card_payload, load_status_rollup, project_overview_frame, latest_briefing,
+    log_time_entry, get_user_time_logs, get_user_hours, get_hours_totals, get_hours_breakdown, get_budget_burn,
+    get_incidents, get_incident, get_incident_page, get_incident_ids, get_incident_metrics, get_incident_aging, search_incidents,
+    save_incident, update_bulk_incidents, diff_incident_grid, apply_incident_grid, import_incidents_csv,
+    export_formats, export_file_name, export_to_file,
+)
 import pandas as pd
 from datetime import datetime, timedelta
 import time
-import json
-import random
+import os
 
 # Inject custom CSS for printing
 st.markdown("""
@@ -68,470 +80,23 @@ st.markdown("""
 # --- Configuration & Constants ---
 st.set_page_config(page_title="Athelas | KP Care at Home", page_icon="🌿", layout="wide")
 
-DB_FILE = "incidents.db"
-
-# --- Fixed Options ---
-SOURCE_CATEGORIES = ["Email", "Chat"]
-ISSUE_TYPES = ["Hardware", "Software", "Network", "Access/Permissions", "Workflow", "Training", "Data Error"]
-WORKAROUND_OPTIONS = ["Yes", "No", "Pending"]
-STATUS_OPTIONS = ["New", "In Progress", "On Hold", "Resolved", "Closed"]
-PROJECT_STATUS_OPTIONS = ["Planning", "Active", "On Hold", "Completed", "Cancelled"]
-HEALTH_COLORS = {"On Track": "🟢", "At Risk": "🟡", "Off Track": "🔴", "Not Started": "⚪", "Completed": "🔵"}
-
-# Reference Tables
-TEAMS = {
-    "AOP": "Agency Operations",
-    "BPF": "Business Performance",
-    "BTS": "Business and Technology Solutions",
-    "CAD": "Community Agency Division",
-    "CLX": "Clinical Excellence",
-    "DME": "Durable Medical Equipment",
-    "EXC": "Executives",
-    "HHC": "Home Health",
-    "HOS": "Hospice",
-    "MTS": "Medical Transportation Services",
-    "PBI": "Prebilling",
-    "RMH": "Referral Management Hub"
-}
-
-PROJECT_TYPES = {
-    "01": "Operations",
-    "02": "Technology",
-    "03": "Clinical",
-    "04": "Compliance",
-    "05": "Finance",
-    "06": "Strategy",
-    "07": "Training",
-    "08": "Data & Analytics",
-    "09": "Communications"
-}
-
-DEFAULT_BTS_MEMBERS = [
-    "Joshua Ay-Ad", "Linda Chow", "Aaron Gunewardena", "Katherine Mollure",
-    "Christine Antonio", "Annie Wongkovit", "Carla Santarromana"
-]
-
-# --- Database Functions ---
-
-def get_db_connection():
-    """Helper to get connection with row factory and timeout for concurrency."""
-    conn = sqlite3.connect(DB_FILE, timeout=10)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def init_db():
-    """Initialize the SQLite database and handle migrations."""
-    conn = get_db_connection()
-    c = conn.cursor()
-
-    # 1. Users
-    c.execute('''CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, team TEXT NOT NULL, is_active INTEGER DEFAULT 1, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-    
-    # 2. Incidents
-    c.execute('''CREATE TABLE IF NOT EXISTS incidents (id INTEGER PRIMARY KEY AUTOINCREMENT, inc_number TEXT, title TEXT, description TEXT, status TEXT, priority TEXT, notes TEXT, cah_manager TEXT, assigned_bts_member TEXT, affected_user TEXT, ssd_it_assigned_to TEXT, source_category TEXT, specific_source TEXT, issue_type TEXT, sn_comments TEXT, bts_notes TEXT, mrn TEXT, workaround TEXT, resolution TEXT, date_ticket_created DATE, date_received_bts DATE, date_escalated_dt DATE, date_reported_epic DATE, project_id INTEGER, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-
-    # 3. Projects
-    c.execute('''CREATE TABLE IF NOT EXISTS projects (id INTEGER PRIMARY KEY AUTOINCREMENT, project_name TEXT NOT NULL, project_code TEXT UNIQUE, description TEXT, project_manager TEXT, business_owner TEXT, executive_sponsor TEXT, assigned_members TEXT, status TEXT DEFAULT 'Planning', start_date DATE, target_end_date DATE, actual_end_date DATE, budget_hours REAL, priority TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-
-    # 4. Time logs
-    c.execute('''CREATE TABLE IF NOT EXISTS time_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER NOT NULL, user_id INTEGER NOT NULL, date DATE NOT NULL, hours REAL NOT NULL, description TEXT, category TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE, FOREIGN KEY (user_id) REFERENCES users(id))''')
-
-    # 5. Project updates (History)
-    c.execute('''CREATE TABLE IF NOT EXISTS project_updates (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER NOT NULL, update_type TEXT NOT NULL, user_name TEXT, update_text TEXT, old_value TEXT, new_value TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE)''')
-
-    # 6. Milestones (NEW)
-    c.execute('''CREATE TABLE IF NOT EXISTS project_milestones (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER, group_name TEXT, milestone_name TEXT, percent_complete INTEGER DEFAULT 0, start_date DATE, end_date DATE, comments TEXT, status TEXT, FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE)''')
-
-    # 7. Status Reports (NEW)
-    c.execute('''CREATE TABLE IF NOT EXISTS status_reports (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER, report_date DATE, next_report_date DATE, health_scope TEXT, health_schedule TEXT, health_budget TEXT, health_resources TEXT, health_quality TEXT, health_overall TEXT, executive_summary TEXT, accomplishments TEXT, next_steps TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE)''')
-
-    # Defaults
-    c.execute("SELECT COUNT(*) as count FROM users")
-    if c.fetchone()['count'] == 0:
-        for member in DEFAULT_BTS_MEMBERS:
-            try: 
-                c.execute("INSERT INTO users (name, team, is_active) VALUES (?, ?, ?)", (member, 'BTS', 1))
-            except Exception as e: print(f"Error init users: {e}")
-
-    # Sample Projects
-    c.execute("SELECT COUNT(*) as count FROM projects")
-    if c.fetchone()['count'] == 0:
-        samples = [
-            ("AOP-25-0101", "Active Episodes – No SOC Workflow Optimization"),
-            ("AOP-25-0102", "Supply Checkout Process Standardization"),
-            ("BTS-25-0201", "eSmart File Manager"),
-            ("CLX-25-0701", "Care Experience All Stars"),
-            ("DME-25-0401", "DME CMS 2024 Alignment"),
-            ("DME-25-0201", "RPA: DME Referral Touchpoints"),
-            ("HHC-25-0101", "Kern Internalization"),
-            ("HOS-25-0101", "After Hours Care Services Optimization"),
-            ("MTS-25-0101", "Non-Scheduled 911 Activation Reduction"),
-            ("PBI-25-0501", "Pre-Billing Enhancements 2025")
-        ]
-        
-        mgr = DEFAULT_BTS_MEMBERS[0] 
-        
-        for code, name in samples:
-            try: 
-                c.execute('''INSERT INTO projects 
-                    (project_name, project_code, description, project_manager, status, start_date, budget_hours, priority) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', 
-                    (name, code, "2025 Strategic Initiative", mgr, "Active", "2025-01-01", 100.0, "High"))
-            except Exception as e: print(f"Error init projects: {e}")
-
-    # --- POPULATE RICH TEST DATA FOR "HOS-25-0101" ---
-    # Find the After Hours project ID
-    c.execute("SELECT id FROM projects WHERE project_code = 'HOS-25-0101'")
-    res = c.fetchone()
-    if res:
-        pid = res['id']
-        c.execute("SELECT count(*) as count FROM project_milestones WHERE project_id = ?", (pid,))
-        if c.fetchone()['count'] == 0:
-            milestones = [
-                (pid, "AHCS Re-alignment", "Collect & analyze data to identify gaps", 80, "2024-11-01", None, "Reviewed productivity data, call volume...", "On Track"),
-                (pid, "AHCS Re-alignment", "Evaluate Current Staffing Model", 90, "2024-11-01", None, "Evaluate staffing model per shift...", "On Track"),
-                (pid, "KPATHS", "Develop Clinical Protocols", 100, "2024-09-01", "2024-11-30", "Completed. Dr. Rosen & Dr. Wong approved.", "Completed"),
-                (pid, "KPATHS", "Develop Training Plan", 100, "2024-11-30", "2025-02-16", "Completed.", "Completed"),
-                (pid, "KPATHS", "System & Access", 100, "2024-08-01", "2025-02-16", "Training & In Production environment complete.", "Completed"),
-                (pid, "KPATHS", "Testing Phase", 100, "2025-03-03", "2025-03-31", "Validation occurred on 02/28.", "Completed"),
-                (pid, "KPATHS", "Maintenance/Enhancements", 60, "2025-03-17", None, "Gathering suggested enhancements.", "On Track"),
-                (pid, "24/7 Hour Model", "Data Collection & Needs Assessment", 100, "2025-01-27", "2025-09-25", "Completed data collection.", "Completed"),
-                (pid, "24/7 Hour Model", "Framework Development", 80, "2025-02-03", "2025-11-30", "Starting to map out staffing model.", "On Track")
-            ]
-            c.executemany("INSERT INTO project_milestones (project_id, group_name, milestone_name, percent_complete, start_date, end_date, comments, status) VALUES (?,?,?,?,?,?,?,?)", milestones)
-            
-            c.execute('''INSERT INTO status_reports 
-                (project_id, report_date, next_report_date, health_scope, health_schedule, health_budget, health_resources, health_quality, health_overall, executive_summary, accomplishments, next_steps)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                (pid, datetime.now().strftime('%Y-%m-%d'), (datetime.now() + timedelta(days=14)).strftime('%Y-%m-%d'),
-                 "On Track", "On Track", "On Track", "On Track", "On Track", "On Track",
-                 "The team is continuing to work on defining the implementation timeline and outline how the new team will be operationalized moving forward. Working on finalizing staffing model & timeline for future After Hours Care Services model with a focus on phase 1.",
-                 "• Re-identified the AHCS Operational Goals to align with KPATHS.\n• Completed data collection for needs assessment.",
-                 "• Re-communication & Accountability plan for in basket - pending\n• Finalize the HI AHCS Support Model\n• Update the framework of future model based on business case results")
-            )
-
-    # Migrations
-    c.execute("PRAGMA table_info(incidents)")
-    if 'project_id' not in [r['name'] for r in c.fetchall()]:
-        try: c.execute("ALTER TABLE incidents ADD COLUMN project_id INTEGER")
-        except Exception as e: print(f"Error migration: {e}")
-
-    # NEW: Migrate Projects table to have business_owner and executive_sponsor
-    c.execute("PRAGMA table_info(projects)")
-    p_cols = [r['name'] for r in c.fetchall()]
-    if 'business_owner' not in p_cols:
-        try: c.execute("ALTER TABLE projects ADD COLUMN business_owner TEXT")
-        except Exception as e: print(f"Error adding business_owner: {e}")
-    if 'executive_sponsor' not in p_cols:
-        try: c.execute("ALTER TABLE projects ADD COLUMN executive_sponsor TEXT")
-        except Exception as e: print(f"Error adding executive_sponsor: {e}")
-
-    conn.commit()
-    conn.close()
-
-# --- Helper Functions ---
-def safe_date(val):
-    if pd.isna(val) or val == "" or val is None: return None
-    try: return datetime.strptime(str(val).split()[0], '%Y-%m-%d')
-    except: return None
-
-def generate_next_project_code(team_code, type_code, year):
-    conn = get_db_connection()
-    yy = str(year)[-2:]
-    prefix = f"{team_code}-{yy}-{type_code}"
-    try:
-        df = pd.read_sql_query("SELECT project_code FROM projects WHERE project_code LIKE ?", conn, params=(f"{prefix}%",))
-        if df.empty: next_seq = 1
-        else:
-            sequences = []
-            for code in df['project_code']:
-                try:
-                    if len(code) >= len(prefix) + 2: sequences.append(int(code[-2:]))
-                except: pass
-            next_seq = max(sequences) + 1 if sequences else 1
-    except Exception as e:
-        print(f"Error generating code: {e}")
-        next_seq = 1
-    finally: conn.close()
-    return f"{prefix}{next_seq:02d}"
-
-# --- Data Access ---
-@st.cache_data(ttl=60) # Performance: Cache user list
-def get_users(active_only=True, team=None):
-    conn = get_db_connection()
-    q = "SELECT * FROM users"
-    conds, params = [], []
-    if active_only: conds.append("is_active = 1")
-    if team: 
-        conds.append("team = ?")
-        params.append(team)
-    if conds: q += " WHERE " + " AND ".join(conds)
-    q += " ORDER BY name"
-    df = pd.read_sql_query(q, conn, params=params)
-    conn.close()
-    return df
-
-def create_user(name, team):
-    if not name or not team: return False
-    conn = get_db_connection()
-    try:
-        conn.execute("INSERT INTO users (name, team, is_active) VALUES (?, ?, 1)", (name, team))
-        conn.commit()
-        get_users.clear() # Fix: Invalidate cache
-        return True
-    except Exception as e:
-        print(f"Error creating user: {e}")
-        return False
-    finally: conn.close()
-
-def update_user(user_id, name, team, is_active):
-    conn = get_db_connection()
-    try:
-        conn.execute("UPDATE users SET name=?, team=?, is_active=? WHERE id=?", (name, team, is_active, user_id))
-        conn.commit()
-        get_users.clear() # Fix: Invalidate cache
-        return True
-    except Exception as e:
-        print(f"Error updating user: {e}")
-        return False
-    finally: conn.close()
-
-def delete_user(user_id):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM users WHERE id=?", (user_id,))
-    conn.commit()
-    get_users.clear() # Fix: Invalidate cache
-    conn.close()
-
-@st.cache_data(ttl=60) # Performance: Cache project list
-def get_projects():
-    conn = get_db_connection()
-    df = pd.read_sql_query("SELECT * FROM projects ORDER BY created_at DESC", conn)
-    conn.close()
-    if not df.empty:
-        df['assigned_members'] = df['assigned_members'].apply(lambda x: json.loads(x) if x else [])
-    return df
-
-def get_project(project_id):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT * FROM projects WHERE id=?", (project_id,))
-    res = c.fetchone()
-    conn.close()
-    if res:
-        d = dict(res)
-        d['assigned_members'] = json.loads(d.get('assigned_members') or '[]')
-        return d
-    return None
-
-def create_project(data):
-    if not data['project_name'] or not data['project_code']: return False
-    conn = get_db_connection()
-    c = conn.cursor()
-    aj = json.dumps(data.get('assigned_members', []))
-    c.execute('''INSERT INTO projects (project_name, project_code, description, project_manager, business_owner, executive_sponsor, assigned_members, status, start_date, target_end_date, budget_hours, priority) 
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-              (data['project_name'], data['project_code'], data['description'], data['project_manager'], data['business_owner'], data['executive_sponsor'], aj, data['status'], data['start_date'], data['target_end_date'], data['budget_hours'], data['priority']))
-    pid = c.lastrowid
-    log_project_update(c, pid, "Created", data.get('project_manager', 'System'), f"Project created: {data['project_name']}")
-    conn.commit()
-    get_projects.clear() # Fix: Invalidate cache
-    conn.close()
-    return pid
-
-def update_project(project_id, data, user_name="System"):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT status FROM projects WHERE id=?", (project_id,))
-    curr = c.fetchone()
-    if curr and curr['status'] != data['status']:
-        log_project_update(c, project_id, "Status Change", user_name, f"Status: {curr['status']} -> {data['status']}")
-    
-    aj = json.dumps(data.get('assigned_members', []))
-    c.execute('''UPDATE projects SET project_name=?, description=?, project_manager=?, business_owner=?, executive_sponsor=?, assigned_members=?, status=?, start_date=?, target_end_date=?, actual_end_date=?, budget_hours=?, priority=?, updated_at=CURRENT_TIMESTAMP WHERE id=?''',
-              (data['project_name'], data['description'], data['project_manager'], data['business_owner'], data['executive_sponsor'], aj, data['status'], data['start_date'], data['target_end_date'], data.get('actual_end_date'), data['budget_hours'], data['priority'], project_id))
-    conn.commit()
-    get_projects.clear() # Fix: Invalidate cache
-    conn.close()
-
-def delete_project(project_id):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM projects WHERE id=?", (project_id,))
-    conn.commit()
-    get_projects.clear() # Fix: Invalidate cache
-    conn.close()
-
-def upsert_project_import(data):
-    conn = get_db_connection()
-    c = conn.cursor()
-    # Check if project exists by code
-    c.execute("SELECT id, status FROM projects WHERE project_code = ?", (data['project_code'],))
-    res = c.fetchone()
-    conn.close()
-    
-    # Clean list data (assigned_members from string "A, B" to list)
-    if isinstance(data.get('assigned_members'), str):
-        data['assigned_members'] = [x.strip() for x in data['assigned_members'].split(',') if x.strip()]
-    
-    # Clean dates
-    for d in ['start_date', 'target_end_date', 'actual_end_date']:
-        if pd.isna(data.get(d)) or data.get(d) == "": data[d] = None
-        
-    if res:
-        # Update
-        update_project(res['id'], data, "Bulk Import")
-    else:
-        # Create
-        create_project(data)
-
-# --- Milestones & Reports ---
-
-def get_milestones(pid):
-    conn = get_db_connection()
-    df = pd.read_sql_query("SELECT * FROM project_milestones WHERE project_id=? ORDER BY start_date", conn, params=(pid,))
-    conn.close()
-    return df
-
-def upsert_milestone(data):
-    conn = get_db_connection()
-    if data.get('id'):
-        conn.execute("UPDATE project_milestones SET group_name=?, milestone_name=?, percent_complete=?, start_date=?, end_date=?, comments=?, status=? WHERE id=?",
-                     (data['group_name'], data['milestone_name'], data['percent_complete'], data['start_date'], data['end_date'], data['comments'], data['status'], data['id']))
-    else:
-        conn.execute("INSERT INTO project_milestones (project_id, group_name, milestone_name, percent_complete, start_date, end_date, comments, status) VALUES (?,?,?,?,?,?,?,?)",
-                     (data['project_id'], data['group_name'], data['milestone_name'], data['percent_complete'], data['start_date'], data['end_date'], data['comments'], data['status']))
-    conn.commit()
-    conn.close()
-
-def delete_milestone(mid):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM project_milestones WHERE id=?", (mid,))
-    conn.commit()
-    conn.close()
-
-def get_latest_status_report(pid):
-    conn = get_db_connection()
-    df = pd.read_sql_query("SELECT * FROM status_reports WHERE project_id=? ORDER BY report_date DESC LIMIT 1", conn, params=(pid,))
-    conn.close()
-    return df.iloc[0] if not df.empty else None
-
-def create_status_report(data):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute('''INSERT INTO status_reports (project_id, report_date, next_report_date, health_scope, health_schedule, health_budget, health_resources, health_quality, health_overall, executive_summary, accomplishments, next_steps)
-                 VALUES (?,?,?,?,?,?,?,?,?,?,?,?)''',
-              (data['project_id'], data['report_date'], data['next_report_date'], data['health_scope'], data['health_schedule'], data['health_budget'], 
-               data['health_resources'], data['health_quality'], data['health_overall'], data['executive_summary'], data['accomplishments'], data['next_steps']))
-    log_project_update(c, data['project_id'], "Status Report", "System", "New formal status report published")
-    conn.commit()
-    conn.close()
-
-# --- Common Access ---
-def log_project_update(cursor, pid, utype, user, text):
-    cursor.execute("INSERT INTO project_updates (project_id, update_type, user_name, update_text) VALUES (?,?,?,?)", (pid, utype, user, text))
-
-def add_status_update(pid, user, text):
-    conn = get_db_connection()
-    c = conn.cursor()
-    log_project_update(c, pid, "Status Update", user, text)
-    conn.commit()
-    conn.close()
-
-def get_project_history(pid):
-    conn = get_db_connection()
-    df = pd.read_sql_query("SELECT * FROM project_updates WHERE project_id=? ORDER BY created_at DESC", conn, params=(pid,))
-    conn.close()
-    return df
-
-def log_time_entry(data):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("INSERT INTO time_logs (project_id, user_id, date, hours, description, category) VALUES (?,?,?,?,?,?)",
-              (data['project_id'], data['user_id'], data['date'], data['hours'], data['description'], data['category']))
-    c.execute("SELECT name FROM users WHERE id=?", (data['user_id'],))
-    res = c.fetchone()
-    uname = res['name'] if res else "Unknown"
-    log_project_update(c, data['project_id'], "Time Logged", uname, f"{data['hours']}h logged: {data['description']}")
-    conn.commit()
-    conn.close()
-
-def get_time_logs(pid=None):
-    conn = get_db_connection()
-    q = "SELECT t.id, t.date, t.hours, t.description, t.category, u.name as user_name, p.project_name, p.project_code, p.budget_hours FROM time_logs t JOIN users u ON t.user_id = u.id JOIN projects p ON t.project_id = p.id"
-    p = []
-    if pid:
-        q += " WHERE t.project_id = ?"
-        p.append(pid)
-    q += " ORDER BY t.date DESC"
-    df = pd.read_sql_query(q, conn, params=p if p else None)
-    conn.close()
-    return df
-
-def upsert_incident(data, id=None):
-    if not data.get('inc_number'): return 
-    conn = get_db_connection()
-    c = conn.cursor()
-    for d in ['date_ticket_created', 'date_received_bts', 'date_escalated_dt', 'date_reported_epic']:
-        if data.get(d) == "": data[d] = None
-    if id:
-        set_c = ', '.join([f"{k}=?" for k in data.keys()])
-        c.execute(f"UPDATE incidents SET {set_c} WHERE id=?", list(data.values()) + [id])
-    else:
-        cols = ', '.join(data.keys())
-        phs = ', '.join(['?']*len(data))
-        c.execute(f"INSERT INTO incidents ({cols}) VALUES ({phs})", list(data.values()))
-    conn.commit()
-    conn.close()
-
-def get_incidents():
-    conn = get_db_connection()
-    df = pd.read_sql_query("SELECT * FROM incidents ORDER BY created_at DESC", conn)
-    conn.close()
-    return df
-
-def delete_records(table, ids):
-    if not ids: return
-    conn = get_db_connection()
-    phs = ','.join(['?']*len(ids))
-    conn.execute(f"DELETE FROM {table} WHERE id IN ({phs})", ids)
-    conn.commit()
-    conn.close()
-
-def update_bulk_incidents(ids, updates):
-    if not ids or not updates: return
-    conn = get_db_connection()
-    parts = [f"{k}=?" for k in updates.keys()]
-    conn.execute(f"UPDATE incidents SET {', '.join(parts)} WHERE id IN ({','.join(['?']*len(ids))})", list(updates.values()) + ids)
-    conn.commit()
-    conn.close()
-
 # --- VISUALIZERS ---
-def render_status_card(proj, latest, milestones):
+def render_status_card(card):
     # Add wrapper div with class for print page breaks
     st.markdown('<div class="project-status-card">', unsafe_allow_html=True)
     
     with st.container(border=True):
-        st.subheader(f"{proj['project_name']} ({proj['project_code']})")
+        st.subheader(card['title'])
         # Header Stats
-        h1, h2, h3, h4, h5, h6 = st.columns(6)
-        def render_health(label, val):
+        for col, (label, val) in zip(st.columns(6), card['health']):
             icon = HEALTH_COLORS.get(val, "⚪")
-            st.markdown(f"**{label}**<br>{icon} {val}", unsafe_allow_html=True)
-        
-        with h1: render_health("Scope", latest['health_scope'])
-        with h2: render_health("Schedule", latest['health_schedule'])
-        with h3: render_health("Budget", latest['health_budget'])
-        with h4: render_health("Resources", latest['health_resources'])
-        with h5: render_health("Quality", latest['health_quality'])
-        with h6: render_health("OVERALL", latest['health_overall'])
+            col.markdown(f"**{label}**<br>{icon} {val}", unsafe_allow_html=True)
         
         st.markdown("---")
         
         # Roles
-        c_roles1, c_roles2, c_roles3 = st.columns(3)
-        with c_roles1: st.markdown(f"**Project Manager:** {proj['project_manager'] or '-'}")
-        with c_roles2: st.markdown(f"**Business Process Owner:** {proj['business_owner'] or '-'}")
-        with c_roles3: st.markdown(f"**Executive Sponsor:** {proj['executive_sponsor'] or '-'}")
+        for col, (label, val) in zip(st.columns(3), card['roles']):
+            col.markdown(f"**{label}:** {val}")
 
         st.markdown("---")
 
@@ -540,59 +105,35 @@ def render_status_card(proj, latest, milestones):
         
         with col_left:
             st.markdown("#### Schedule")
-            if not milestones.empty:
-                disp_ms = milestones[['milestone_name', 'percent_complete', 'start_date', 'end_date', 'comments']].copy()
-                st.dataframe(disp_ms, hide_index=True, use_container_width=True)
+            if card['milestones'] is not None:
+                st.dataframe(card['milestones'], hide_index=True, use_container_width=True)
             else:
                 st.caption("No milestones defined.")
                 
         with col_right:
             st.markdown("#### Executive Summary")
-            st.info(latest['executive_summary'] or "No summary.")
+            st.info(card['executive_summary'])
             
             st.markdown("#### Accomplishments")
-            st.write(latest['accomplishments'] or "-")
+            st.write(card['accomplishments'])
             
             st.markdown("#### Next Steps")
-            st.write(latest['next_steps'] or "-")
+            st.write(card['next_steps'])
             
-        st.caption(f"Report Date: {latest['report_date']} | Next Report: {latest['next_report_date']}")
+        st.caption(f"Report Date: {card['report_date']} | Next Report: {card['next_report_date']}")
     
     # Close the wrapper div
     st.markdown('</div>', unsafe_allow_html=True)
 
-def render_project_overview_table(active_projs):
+def render_project_overview_table(active_projs, latest=None):
     """Renders the tabular view of all active projects for the Overview tab."""
     if active_projs.empty:
         st.info("No active projects to display.")
         return
 
-    overview_data = []
-    
-    for _, proj in active_projs.iterrows():
-        latest_rep = get_latest_status_report(proj['id'])
-        
-        status_val = latest_rep['health_overall'] if latest_rep is not None else "Not Started"
-        status_icon = HEALTH_COLORS.get(status_val, "⚪")
-        
-        frequency = "Biweekly" 
-        
-        team_code = proj['project_code'].split('-')[0] if '-' in proj['project_code'] else "UNK"
-        team_name = TEAMS.get(team_code, team_code)
-        
-        row = {
-            "Alert": status_icon,
-            "Project Name": proj['project_name'],
-            "Project Lead": proj['project_manager'],
-            "Project Team": team_name, 
-            "Status": status_val,
-            "Frequency": frequency,
-            "Project ETC": proj['target_end_date']
-        }
-        overview_data.append(row)
-        
-    df_overview = pd.DataFrame(overview_data)
-    
+    if latest is None: latest = get_latest_status_reports(active_projs['id'].tolist())
+    df_overview = project_overview_frame(active_projs, latest)
+
     st.dataframe(
         df_overview,
         column_config={
@@ -608,9 +149,8 @@ def render_project_overview_table(active_projs):
 # --- FORMS ---
 def incident_form(key_prefix, d=None):
     d = d or {}
-    projs = get_projects()
-    p_opts = ["None"] + [f"{r['project_code']} - {r['project_name']}" for _, r in projs.iterrows()]
-    bts = get_users(active_only=True, team='BTS')['name'].tolist()
+    lk = get_lookup()
+    bts = lk.user_names(team='BTS')
     
     st.markdown("### 🎫 Ticket ID")
     c1,c2,c3,c4 = st.columns(4)
@@ -622,13 +162,9 @@ def incident_form(key_prefix, d=None):
     tit = st.text_input("Summary", d.get('title',''), key=f"{key_prefix}_ti")
     
     curr_p = d.get('project_id')
-    pidx = 0
-    if curr_p and not projs.empty:
-        match = projs[projs['id']==curr_p]
-        if not match.empty:
-            pstr = f"{match.iloc[0]['project_code']} - {match.iloc[0]['project_name']}"
-            if pstr in p_opts: pidx = p_opts.index(pstr)
-    lp = st.selectbox("Link Project", p_opts, index=pidx, key=f"{key_prefix}_lp")
+    p_opts = [None] + list(lk.projects)
+    pidx = p_opts.index(int(curr_p)) if pd.notna(curr_p) and int(curr_p) in lk.projects else 0
+    pid = st.selectbox("Link Project", p_opts, index=pidx, format_func=lk.project_label, key=f"{key_prefix}_lp")
     
     st.markdown("### 👥 Assign")
     p1,p2,p3,p4 = st.columns(4)
@@ -657,24 +193,18 @@ def incident_form(key_prefix, d=None):
     btsn = n1.text_area("BTS Notes", d.get('bts_notes',''), height=100, key=f"{key_prefix}_bn")
     res = n2.text_area("Resolution", d.get('resolution',''), height=240, key=f"{key_prefix}_res")
     
-    pid = None
-    if lp != "None" and not projs.empty:
-        code = lp.split(" - ")[0]
-        m = projs[projs['project_code']==code]
-        if not m.empty: pid = int(m.iloc[0]['id'])
-        
     return {
         'inc_number': inc, 'title': tit, 'status': stat, 'mrn': mrn, 'issue_type': iss, 
         'cah_manager': mgr, 'assigned_bts_member': abts if abts != "Unassigned" else "", 
         'affected_user': aff, 'ssd_it_assigned_to': ssd,
         'date_ticket_created': dt1, 'date_received_bts': dt2, 'date_escalated_dt': dt3, 'date_reported_epic': dt4,
         'source_category': src, 'specific_source': spec, 'workaround': wa,
-        'sn_comments': snc, 'bts_notes': bts_nt, 'resolution': res, 'project_id': pid
+        'sn_comments': snc, 'bts_notes': btsn, 'resolution': res, 'project_id': pid
     }
 
 def project_form(key_prefix, d=None):
     d = d or {}
-    users = get_users(active_only=True)['name'].tolist()
+    users = get_lookup().user_names()
     is_new = d == {}
     
     c1, c2 = st.columns(2)
@@ -686,10 +216,10 @@ def project_form(key_prefix, d=None):
             t = gc1.selectbox("Team", list(TEAMS.keys()), key=f"{key_prefix}_t")
             tp = gc2.selectbox("Type", list(PROJECT_TYPES.keys()), format_func=lambda x: f"{x}-{PROJECT_TYPES[x]}", key=f"{key_prefix}_tp")
             yr = gc3.number_input("Year", 2024, 2030, datetime.now().year, key=f"{key_prefix}_yr")
-            cd = generate_next_project_code(t, tp, yr)
-            st.info(f"Code: {cd}")
+            cd, series = None, (t, tp, yr)
+            st.info(f"Code: {preview_project_code(t, tp, yr)} (assigned on create)")
         else:
-            cd = st.text_input("Code", d.get('project_code',''), disabled=True, key=f"{key_prefix}_cd")
+            cd, series = st.text_input("Code", d.get('project_code',''), disabled=True, key=f"{key_prefix}_cd"), None
         
         cidx = users.index(d.get('project_manager'))+1 if d.get('project_manager') in users else 0
         pm = st.selectbox("Project Manager *", [""]+users, index=cidx, key=f"{key_prefix}_pm")
@@ -714,7 +244,7 @@ def project_form(key_prefix, d=None):
     ad = d3.date_input("Actual", safe_date(d.get('actual_end_date')), key=f"{key_prefix}_ad")
     
     return {
-        'project_name': nm, 'project_code': cd, 'description': dsc, 'project_manager': pm,
+        'project_name': nm, 'project_code': cd, 'code_series': series, 'description': dsc, 'project_manager': pm,
         'business_owner': bpo, 'executive_sponsor': esp,
         'assigned_members': mem, 'status': stt, 'start_date': sd, 'target_end_date': td, 
         'actual_end_date': ad, 'budget_hours': bg, 'priority': pri
@@ -735,35 +265,25 @@ def landing_page():
     """, unsafe_allow_html=True)
     
     # User Selection Logic
-    all_u = get_users(active_only=True)
-    
-    current_user_name = ""
-    if st.session_state.curr_user_id:
-        user_row = all_u[all_u['id'] == st.session_state.curr_user_id]
-        if not user_row.empty:
-            current_user_name = user_row.iloc[0]['name']
+    lk = get_lookup()
+    current_user_name = lk.users.get(st.session_state.curr_user_id, {}).get('name', "")
 
     with st.container():
         c_team, c_user = st.columns(2)
         with c_team:
             sel_team_display = st.selectbox("1. Filter by Team", ["All Teams"] + list(TEAMS.keys()), index=0)
         with c_user:
-            if sel_team_display != "All Teams":
-                filtered_users = all_u[all_u['team'] == sel_team_display]
-            else:
-                filtered_users = all_u
-            
-            user_map = {u['name']: u['id'] for _, u in filtered_users.iterrows()}
-            curr_name_in_list = current_user_name if current_user_name in user_map else ""
+            names = lk.user_names(team=None if sel_team_display == "All Teams" else sel_team_display)
+            curr_name_in_list = current_user_name if current_user_name in names else ""
             
             sel_user = st.selectbox(
                 "2. Select User", 
-                [""] + list(user_map.keys()), 
-                index=list(user_map.keys()).index(curr_name_in_list)+1 if curr_name_in_list else 0
+                [""] + names, 
+                index=names.index(curr_name_in_list)+1 if curr_name_in_list else 0
             )
             
             if sel_user:
-                st.session_state.curr_user_id = user_map[sel_user]
+                st.session_state.curr_user_id = lk.user_id_by_name[sel_user]
             else:
                 st.session_state.curr_user_id = None
 
@@ -791,6 +311,29 @@ def landing_page():
             st.session_state.page = "admin_auth"
             st.rerun()
 
+def incident_filters(key_prefix, default_status=None):
+    """Status and assignee multiselects shared by the incident Dashboard and Bulk editor."""
+    f1, f2 = st.columns(2)
+    sf = f1.multiselect("Status", STATUS_OPTIONS, default_status or [], key=f"{key_prefix}_fs")
+    mf = f2.multiselect("Assignee", ["Unassigned"]+get_lookup().user_names(team='BTS'), key=f"{key_prefix}_fa")
+    return sf, mf
+
+def page_cursor(name, filter_key):
+    """Keyset cursor of the page currently shown in a paged view; back to page 1 when filter_key changes."""
+    state = st.session_state.setdefault(f"{name}_pager", {"key": None, "cursors": [None]})
+    if state["key"] != filter_key: state.update(key=filter_key, cursors=[None])
+    return state["cursors"][-1]
+
+def render_pager(name, next_cursor):
+    """Newer/Older buttons for a view paged with page_cursor()."""
+    state = st.session_state[f"{name}_pager"]
+    b1, b2, cap = st.columns([1, 1, 4])
+    if b1.button("← Newer", disabled=len(state["cursors"]) == 1, key=f"{name}_newer"):
+        state["cursors"].pop(); st.rerun()
+    if b2.button("Older →", disabled=next_cursor is None, key=f"{name}_older"):
+        state["cursors"].append(next_cursor); st.rerun()
+    cap.caption(f"Page {len(state['cursors'])}")
+
 def render_home_btn():
     if st.sidebar.button("🏠 Home", use_container_width=True): st.session_state.page = "home"; st.rerun()
     st.sidebar.markdown("---")
@@ -799,112 +342,235 @@ def render_home_btn():
 def route_incidents():
     render_home_btn()
     st.sidebar.title("🔴 Incidents")
-    menu = st.sidebar.radio("Menu", ["Dashboard", "Log New", "Manage"])
+    menu = st.sidebar.radio("Menu", ["Dashboard", "Aging", "Log New", "Manage"])
+    get_perf().set_route(f"incidents/{menu}")
     
     if menu == "Dashboard":
         if st.session_state.get('dash_edit_id'):
             st.title("📝 Edit")
             st.button("← Back", on_click=lambda: st.session_state.update(dash_edit_id=None))
-            row = get_incidents().loc[get_incidents()['id'] == st.session_state.dash_edit_id].iloc[0]
+            row = get_incident(st.session_state.dash_edit_id)
             with st.form("de"):
-                nd = incident_form("de", row.to_dict())
+                nd = incident_form("de", row)
                 if st.form_submit_button("Update", type="primary"):
-                    upsert_incident(nd, st.session_state.dash_edit_id)
-                    st.success("Updated"); st.session_state.dash_edit_id = None; time.sleep(0.5); st.rerun()
+                    err = save_incident(nd, st.session_state.dash_edit_id)
+                    if err: st.error(err)
+                    else: st.success("Updated"); st.session_state.dash_edit_id = None; time.sleep(0.5); st.rerun()
         else:
             st.title("📊 Dashboard")
-            df = get_incidents()
+            m = get_incident_metrics()
             c1,c2,c3 = st.columns(3)
-            c1.metric("Total", len(df))
-            c2.metric("Active", len(df[~df['status'].isin(['Resolved','Closed'])]))
-            c3.metric("Unassigned", len(df[(df['assigned_bts_member'].isin(['Unassigned',None,''])) & (~df['status'].isin(['Resolved','Closed']))]))
-            
-            f1,f2 = st.columns(2)
-            sf = f1.multiselect("Status", STATUS_OPTIONS, ["New", "In Progress", "On Hold"])
-            mf = f2.multiselect("Assignee", ["Unassigned"]+get_users(active_only=True, team='BTS')['name'].tolist())
+            c1.metric("Total", m['total'])
+            c2.metric("Active", m['active'])
+            c3.metric("Unassigned", m['unassigned'])
+            if m['total']:
+                with st.expander("Breakdown"):
+                    b1, b2 = st.columns(2)
+                    b1.markdown("#### By Status")
+                    b1.bar_chart(pd.Series(m['by_status'], name="incidents"))
+                    b2.markdown("#### Active by Assignee")
+                    b2.bar_chart(pd.Series(m['by_assignee'], name="incidents"))
             
-            fil = df.copy()
-            fil['assigned_bts_member'] = fil['assigned_bts_member'].fillna('Unassigned').replace('', 'Unassigned')
-            if sf: fil = fil[fil['status'].isin(sf)]
-            if mf: fil = fil[fil['assigned_bts_member'].isin(mf)]
+            sf, mf = incident_filters("dash", ["New", "In Progress", "On Hold"])
+            fil, next_cursor = get_incident_page(sf, mf, after=page_cursor("dash", (tuple(sf), tuple(mf))))
             
             sel = st.dataframe(
-                fil[['inc_number','status','assigned_bts_member','title','date_ticket_created','id']], 
-                column_config={"id":None}, 
+                fil[['inc_number','status','assigned_bts_member','title','date_ticket_created','days_to_receive','days_to_escalate','id']], 
+                column_config={"id":None,
+                               "days_to_receive": st.column_config.NumberColumn("Days to Receive", format="%.1f"),
+                               "days_to_escalate": st.column_config.NumberColumn("Days to Escalate", format="%.1f")}, 
                 hide_index=True, 
                 on_select="rerun", 
                 selection_mode="single-row", 
                 use_container_width=True
             )
+            render_pager("dash", next_cursor)
             if sel.selection.rows:
-                selected_id = fil.iloc[sel.selection.rows[0]]['id']
+                selected_id = int(fil.iloc[sel.selection.rows[0]]['id'])
                 st.session_state.dash_edit_id = selected_id
                 st.rerun()
 
+    elif menu == "Aging":
+        st.title("⏳ Aging & SLA")
+        f1, f2, f3 = st.columns(3)
+        start = f1.date_input("Created From", value=None, key="ag_start")
+        end = f2.date_input("Created To", value=None, key="ag_end")
+        by = f3.selectbox("Group By", [g for g in INCIDENT_AGING_GROUPS if g != "overall"], format_func=lambda g: g.replace("_", " ").title(), key="ag_by")
+        today = datetime.now().date()
+        overall = get_incident_aging(today, "overall", start, end).set_index("metric")
+        if overall.empty: st.info("No incidents with a ticket created date in this range."); return
+
+        labels = {"days_to_receive": "Ticket → BTS", "days_to_escalate": "BTS → Escalated", "open_age": "Open Age"}
+        for col, (metric, label) in zip(st.columns(3), labels.items()):
+            if metric not in overall.index: col.metric(label, "-"); continue
+            r = overall.loc[metric]
+            col.metric(f"{label} p50 / p90 (days)", f"{r['p50']:.1f} / {r['p90']:.1f}", help=f"{int(r['incidents'])} incidents; {r['within_sla']:.0%} within the {INCIDENT_SLA_DAYS[metric]}-day target")
+        st.caption("Percentiles are nearest-rank. Open age covers active incidents only.")
+        st.markdown("---")
+
+        aging = get_incident_aging(today, by, start, end)
+        for metric, label in labels.items():
+            st.markdown(f"#### {label} (target {INCIDENT_SLA_DAYS[metric]} days)")
+            part = aging[aging['metric'] == metric].drop(columns='metric')
+            if part.empty: st.caption("No data."); continue
+            st.dataframe(part, hide_index=True, use_container_width=True,
+                         column_config={"within_sla": st.column_config.ProgressColumn("Within Target", format="percent", min_value=0, max_value=1)})
+
     elif menu == "Log New":
         st.title("📝 Log New")
         with st.form("ln"):
             d = incident_form("ln")
             if st.form_submit_button("Save", type="primary"):
-                upsert_incident(d); st.success("Saved")
+                err = save_incident(d)
+                if err: st.error(err)
+                else: st.success("Saved")
     elif menu == "Manage":
         st.title("🛠️ Manage")
-        df = get_incidents()
-        mode = st.radio("Mode", ["Single", "Bulk"], horizontal=True)
+        mode = st.radio("Mode", ["Single", "Bulk", "Grid"], horizontal=True)
         if mode == "Single":
-            s = st.text_input("Search")
-            if s: df = df[df.astype(str).apply(lambda x: x.str.contains(s, case=False)).any(axis=1)]
+            s = st.text_input("Search", help="Matches INC#, summary, description, comments, notes, resolution, MRN and affected user; words match as prefixes.")
+            if s:
+                df = search_incidents(s)
+                st.caption(f"{len(df)} match(es), best first")
+            else: df = get_incidents()
             if not df.empty:
-                iid = st.selectbox("Select", df['id'].tolist(), format_func=lambda x: f"{df[df['id']==x].iloc[0]['inc_number']} - {df[df['id']==x].iloc[0]['title']}")
+                labels = {i: f"{n} - {t}" for i, n, t in zip(df['id'].tolist(), df['inc_number'], df['title'])}
+                iid = st.selectbox("Select", list(labels), format_func=labels.get)
                 with st.form("se"):
                     nd = incident_form("se", df[df['id']==iid].iloc[0].to_dict())
-                    if st.form_submit_button("Update", type="primary"): upsert_incident(nd, iid); st.success("Updated"); time.sleep(0.5); st.rerun()
+                    if st.form_submit_button("Update", type="primary"):
+                        err = save_incident(nd, iid)
+                        if err: st.error(err)
+                        else: st.success("Updated"); time.sleep(0.5); st.rerun()
                 if st.button("Delete"): delete_records('incidents', [iid]); st.success("Deleted"); st.rerun()
+        elif mode == "Grid":
+            st.caption("Edit cells in place, then save; only the changed cells are written.")
+            if "grid_gen" not in st.session_state: st.session_state.grid_gen = 0
+            sf, mf = incident_filters("grid")
+            fkey = (tuple(sf), tuple(mf))
+            if st.session_state.get("grid_fkey") != fkey:
+                st.session_state.grid_fkey = fkey
+                st.session_state.grid_gen += 1
+            page, next_cursor = get_incident_page(sf, mf, after=page_cursor("grid", fkey), columns="*")
+            # Editor edits are stored by row position, so the key pins the exact incidents shown and
+            # edits are diffed against the page as it was when editing started, not a fresh read.
+            ekey = f"grid_ed_{st.session_state.grid_gen}_{len(st.session_state['grid_pager']['cursors'])}_{hash(tuple(page['id']))}"
+            snap = st.session_state.get("grid_snap")
+            if snap is None or snap[0] != ekey or not st.session_state.get(ekey, {}).get("edited_rows"):
+                snap = st.session_state.grid_snap = (ekey, page)
+            page = snap[1]
+            lk = get_lookup()
+            opts = lambda values, current: values + sorted(set(current.dropna()) - set(values) - {""})  # keep legacy values selectable
+            ed = st.data_editor(page, hide_index=True, disabled=[c for c in page.columns if c not in INCIDENT_GRID_COLUMNS],
+                                column_config={
+                                    "status": st.column_config.SelectboxColumn("status", options=opts(STATUS_OPTIONS, page['status'])),
+                                    "assigned_bts_member": st.column_config.SelectboxColumn("assigned_bts_member", options=opts(lk.user_names(team='BTS'), page['assigned_bts_member'])),
+                                    "issue_type": st.column_config.SelectboxColumn("issue_type", options=opts(ISSUE_TYPES, page['issue_type'])),
+                                    "source_category": st.column_config.SelectboxColumn("source_category", options=opts(SOURCE_CATEGORIES, page['source_category'])),
+                                    "workaround": st.column_config.SelectboxColumn("workaround", options=opts(WORKAROUND_OPTIONS, page['workaround'])),
+                                    "days_to_receive": st.column_config.NumberColumn("Days to Receive", format="%.1f"),
+                                    "days_to_escalate": st.column_config.NumberColumn("Days to Escalate", format="%.1f"),
+                                },
+                                key=ekey)
+            changes = diff_incident_grid(page, ed)
+            n = sum(len(v) for v in changes.values())
+            g1, g2, _ = st.columns([1, 1, 4])
+            if g1.button(f"Save {n} Change(s)", type="primary", disabled=not n):
+                updated, conflicts = apply_incident_grid(changes)
+                st.session_state.grid_gen += 1
+                st.success(f"Saved {updated} cell(s)")
+                if conflicts: st.warning(f"{conflicts} cell(s) were changed by someone else since this page loaded and were not saved.")
+                time.sleep(0.5); st.rerun()
+            if g2.button("Discard", disabled=not n): st.session_state.grid_gen += 1; st.rerun()
+            render_pager("grid", next_cursor)
         else:
-            if "bs" not in st.session_state: st.session_state.bs = False
-            if st.button("Select All"): st.session_state.bs = True; st.rerun()
-            dfs = df.copy(); dfs.insert(0,"Select",st.session_state.bs)
-            ed = st.data_editor(dfs, hide_index=True, column_config={"Select":st.column_config.CheckboxColumn(width="small")}, disabled=df.columns)
-            sel = ed[ed.Select]
-            if not sel.empty:
-                if st.button("Delete Selected"): delete_records('incidents', sel['id'].tolist()); st.session_state.bs = False; st.rerun()
+            # Selections are an id set in session state, so they survive paging; changing the filters clears them.
+            if "bulk_sel" not in st.session_state: st.session_state.bulk_sel = set()
+            if "bulk_gen" not in st.session_state: st.session_state.bulk_gen = 0
+            def reset_selection(ids=()):
+                st.session_state.bulk_sel = set(ids)
+                st.session_state.bulk_gen += 1  # fresh editor widgets, dropping stale checkbox edits
+
+            sf, mf = incident_filters("bulk")
+            fkey = (tuple(sf), tuple(mf))
+            if st.session_state.get("bulk_fkey") != fkey:
+                st.session_state.bulk_fkey = fkey
+                reset_selection()
+            selected = st.session_state.bulk_sel
+            page, next_cursor = get_incident_page(sf, mf, after=page_cursor("bulk", fkey), columns="*")
+            b1, b2, _ = st.columns([1, 1, 4])
+            if b1.button("Select All"): reset_selection(get_incident_ids(sf, mf)); st.rerun()
+            if b2.button("Clear Selection"): reset_selection(); st.rerun()
+
+            dfs = page.copy(); dfs.insert(0, "Select", dfs['id'].isin(selected))
+            pager = st.session_state["bulk_pager"]
+            # Checkbox edits are kept by row position; keying on the page's ids drops them if the rows change.
+            ed = st.data_editor(dfs, hide_index=True, column_config={"Select":st.column_config.CheckboxColumn(width="small")}, disabled=page.columns,
+                                key=f"bulk_ed_{st.session_state.bulk_gen}_{len(pager['cursors'])}_{hash(tuple(page['id']))}")
+            checked = set(ed.loc[ed.Select, 'id'].astype(int))
+            selected -= set(page['id'].astype(int)) - checked
+            selected |= checked
+            render_pager("bulk", next_cursor)
+            st.caption(f"{len(selected)} incident(s) selected")
+
+            if selected:
+                if st.button("Delete Selected"): delete_records('incidents', list(selected)); reset_selection(); st.rerun()
                 with st.form("bulk"):
                     ns = st.selectbox("Status", ["(No Change)"]+STATUS_OPTIONS)
-                    na = st.selectbox("Assignee", ["(No Change)","Unassigned"]+get_users(active_only=True, team='BTS')['name'].tolist())
+                    na = st.selectbox("Assignee", ["(No Change)","Unassigned"]+get_lookup().user_names(team='BTS'))
                     if st.form_submit_button("Update"):
                         u = {}
                         if ns != "(No Change)": u['status'] = ns
                         if na != "(No Change)": u['assigned_bts_member'] = "" if na == "Unassigned" else na
-                        if u: update_bulk_incidents(sel['id'].tolist(), u); st.session_state.bs = False; st.rerun()
+                        if u: update_bulk_incidents(list(selected), u); reset_selection(); st.rerun()
 
 def route_projects():
     render_home_btn()
     st.sidebar.title("🔵 Projects")
     menu = st.sidebar.radio("Menu", ["Analytics", "Manage Projects", "Status Reports", "Time Tracking"])
+    get_perf().set_route(f"projects/{menu}")
     
     if menu == "Analytics":
         st.title("📊 Analytics")
-        logs = get_time_logs()
-        projs = get_projects()
+        f1, f2, f3 = st.columns(3)
+        start = f1.date_input("From", value=None, key="an_start")
+        end = f2.date_input("To", value=None, key="an_end")
+        period = f3.selectbox("Period", ["week", "month"], format_func=str.title, key="an_period")
+        totals = get_hours_totals(start, end)
+        burn = get_budget_burn(end or datetime.now().date())
         
         c1,c2,c3 = st.columns(3)
-        c1.metric("Logged Hours", f"{logs['hours'].sum():.1f}")
-        c2.metric("Active Projects", len(projs[projs['status']=='Active']))
-        c3.metric("Contributors", logs['user_name'].nunique() if not logs.empty else 0)
+        c1.metric("Logged Hours", f"{totals['hours']:.1f}")
+        c2.metric("Active Projects", int((burn['status'] == 'Active').sum()))
+        c3.metric("Contributors", totals['contributors'])
         st.markdown("---")
         
-        if not logs.empty:
+        if totals['hours']:
             c1,c2 = st.columns(2)
             c1.markdown("#### ⏳ By Project")
-            c1.bar_chart(logs.groupby("project_name")['hours'].sum())
+            c1.bar_chart(get_hours_breakdown("project", start, end).set_index("project_name")['hours'])
             c2.markdown("#### 🏆 By Person")
-            c2.bar_chart(logs.groupby("user_name")['hours'].sum())
+            c2.bar_chart(get_hours_breakdown("person", start, end).set_index("user_name")['hours'])
+            c1,c2 = st.columns(2)
+            c1.markdown("#### 🏷️ By Category")
+            c1.bar_chart(get_hours_breakdown("category", start, end).set_index("category")['hours'])
+            c2.markdown(f"#### 📅 By {period.title()}")
+            c2.line_chart(get_hours_breakdown(period, start, end).set_index("period")['hours'])
+
+        st.markdown("#### 🔥 Budget Burn")
+        st.caption(f"Lifetime hours against budget. Burn rate is the average hours per week over the last {ANALYTICS_BURN_WINDOW_DAYS} days.")
+        burn = burn[(burn['budget_hours'] > 0) | (burn['logged_hours'] > 0)]
+        st.dataframe(burn[['project_code', 'project_name', 'status', 'budget_hours', 'logged_hours', 'remaining_hours', 'burn_pct', 'burn_rate', 'weeks_left']],
+                     hide_index=True, use_container_width=True,
+                     column_config={"burn_pct": st.column_config.ProgressColumn("Burned %", min_value=0, max_value=100, format="%.0f%%"),
+                                    "burn_rate": st.column_config.NumberColumn("Burn (h/wk)", format="%.1f"),
+                                    "weeks_left": st.column_config.NumberColumn("Weeks Left", format="%.1f")})
             
     elif menu == "Manage Projects":
         st.title("📁 Manage Projects")
         
-        projs = get_projects()
-        if projs.empty:
+        lk = get_lookup()
+        if not lk.projects:
             st.info("No projects.")
             with st.expander("Create New Project", expanded=True):
                 with st.form("np"):
@@ -914,7 +580,7 @@ def route_projects():
                         else: create_project(pd_data); st.success("Created"); st.rerun()
         else:
             c_sel, c_new = st.columns([3, 1])
-            pid = c_sel.selectbox("Select Project", projs['id'].tolist(), format_func=lambda x: f"{projs[projs['id']==x].iloc[0]['project_code']} - {projs[projs['id']==x].iloc[0]['project_name']}", key="mp_selector")
+            pid = c_sel.selectbox("Select Project", list(lk.projects), format_func=lk.project_label, key="mp_selector")
             
             if c_new.button("➕ Create New"):
                 st.session_state.creating_project = True
@@ -989,7 +655,7 @@ def route_projects():
                 st.markdown("### 📢 Status Reporting")
                 latest = get_latest_status_report(pid)
                 if latest is not None:
-                    render_status_card(proj, latest, get_milestones(pid))
+                    render_status_card(status_card_payload(proj, latest, get_milestones(pid)))
                 
                 st.markdown("---")
                 with st.expander("➕ Create New Status Report"):
@@ -1023,9 +689,20 @@ def route_projects():
                             st.success("Published!"); st.rerun()
 
             with pt4: # History
-                hist = get_project_history(pid)
-                if not hist.empty:
+                utype = st.selectbox("Type", ["All"] + get_project_history_types(pid), key=f"hist_type_{pid}")
+                utype = None if utype == "All" else utype
+                pages_key = f"hist_pages_{pid}_{utype}"
+                pages, cursor = [], None
+                for _ in range(st.session_state.get(pages_key, 1)):  # earlier pages come from the query cache
+                    page, cursor = get_project_history(pid, utype, cursor)
+                    pages.append(page)
+                    if cursor is None: break
+                hist = pd.concat(pages, ignore_index=True)
+                if hist.empty: st.caption("No history yet.")
+                else:
                     st.dataframe(hist[['created_at','update_type','user_name','update_text']], hide_index=True, use_container_width=True)
+                    if cursor is not None and st.button("Load More", key=f"hist_more_{pid}"):
+                        st.session_state[pages_key] = len(pages) + 1; st.rerun()
 
     elif menu == "Status Reports":
         st.title("📊 Status Reporting")
@@ -1041,7 +718,20 @@ def route_projects():
         with tabs[1]:
             st.markdown("### 📄 Executive Status Briefing")
             st.caption("Detailed vertical rollup of latest status reports for all active projects.")
-            
+
+            brief = latest_briefing()
+            c1, c2 = st.columns([3, 1])
+            if brief['path']:
+                with open(brief['path'], 'rb') as f:
+                    c1.download_button("⬇️ Download Briefing (HTML)", f.read(), f"status_briefing_{datetime.fromtimestamp(os.path.getmtime(brief['path'])):%Y%m%d_%H%M}.html", "text/html", type="primary")
+            if brief['pending']:
+                c1.caption("Rendering the latest briefing in the background..." + (" The download above is the previous version." if brief['path'] else ""))
+                c2.button("Check Again")
+            elif brief['error']:
+                c1.error(f"Briefing render failed: {brief['error']}")
+                if c2.button("Retry"): latest_briefing(retry=True); st.rerun()
+            else: c1.caption("Up to date. Open the file in a browser and print to PDF; each project starts a new page.")
+
             if st.button("Generate Vertical Rollup"):
                 st.markdown("## 📅 Executive Project Status Rollup")
                 st.markdown(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M')}")
@@ -1054,31 +744,32 @@ def route_projects():
                     st.warning("No active projects found.")
                 else:
                     st.markdown("### 📋 High-Level Overview")
-                    render_project_overview_table(active_projs)
+                    latest = get_latest_status_reports(active_projs['id'].tolist())
+                    render_project_overview_table(active_projs, latest)
                     st.markdown("---")
                     st.markdown("<br>", unsafe_allow_html=True)
 
-                    for _, proj in active_projs.iterrows():
-                        latest_rep = get_latest_status_report(proj['id'])
-                        if latest_rep is not None:
-                            ms = get_milestones(proj['id'])
-                            render_status_card(proj, latest_rep, ms)
-                            st.markdown("<br>", unsafe_allow_html=True) 
-                        else:
-                            pass
+                    for card in load_status_rollup(active_projs, latest):
+                        render_status_card(card)
+                        st.markdown("<br>", unsafe_allow_html=True)
                 st.success("End of Report")
 
     elif menu == "Time Tracking":
         st.title("⏱️ Log Time")
         if not st.session_state.curr_user_id: st.warning("Select User in sidebar"); return
+        me = get_user(st.session_state.curr_user_id)
+        if not me: st.warning("Select User in sidebar"); return
         
-        projs = get_projects()
-        if projs.empty: st.info("No projects."); return
+        lk = get_lookup()
+        if not lk.projects: st.info("No projects."); return
+        mine = get_member_projects(me['name'])
+        mine_ids = [int(i) for i in mine['id']]
         
         c1, c2 = st.columns([2,1])
         with c1:
             with st.form("tl"):
-                pid = st.selectbox("Project", projs['id'].tolist(), format_func=lambda x: projs[projs['id']==x].iloc[0]['project_name'])
+                # My projects first, then everything else newest first
+                pid = st.selectbox("Project", mine_ids + [i for i in lk.projects if i not in mine_ids], format_func=lambda x: lk.projects[x]['project_name'])
                 d1, d2 = st.columns(2)
                 dt = d1.date_input("Date", datetime.now())
                 hr = d2.number_input("Hours", 0.25, 24.0, 1.0, 0.25)
@@ -1089,22 +780,16 @@ def route_projects():
                 if st.form_submit_button("Log", type="primary"):
                     if not desc: st.error("Desc required")
                     else:
-                        log_time_entry({'project_id':pid, 'user_id':st.session_state.curr_user_id, 'date':dt, 'hours':hr, 'description':desc, 'category':cat})
-                        if stat_up:
-                            un = get_users(active_only=False)
-                            un = un[un['id']==st.session_state.curr_user_id].iloc[0]['name']
-                            add_status_update(pid, un, stat_up)
+                        log_time_entry({'project_id':pid, 'user_id':me['id'], 'date':dt, 'hours':hr, 'description':desc, 'category':cat})
+                        if stat_up: add_status_update(pid, me['name'], stat_up)
                         st.success("Logged"); st.rerun()
         
         with c2:
-            tlogs = get_time_logs()
-            all_u = get_users(active_only=False)
-            u_row = all_u[all_u['id'] == st.session_state.curr_user_id]
-            if not u_row.empty:
-                uname = u_row.iloc[0]['name']
-                u_logs = tlogs[tlogs['user_name']==uname]
-                st.metric("My Hours", u_logs['hours'].sum())
-                st.dataframe(u_logs.head(5)[['date','project_name','hours']], hide_index=True)
+            st.metric("My Hours", get_user_hours(me['id'])['hours'])
+            st.dataframe(get_user_time_logs(me['id'])[['date','project_name','hours']], hide_index=True)
+            st.markdown("#### My Projects")
+            if mine.empty: st.caption("You are not on any project team.")
+            else: st.dataframe(mine[['project_code','project_name','status']], hide_index=True)
 
 def route_admin_auth():
     render_home_btn()
@@ -1117,7 +802,8 @@ def route_admin_auth():
 def route_admin_panel():
     render_home_btn()
     st.sidebar.title("⚫ Admin")
-    menu = st.sidebar.radio("Menu", ["Users", "Imports/Exports", "Logout"])
+    menu = st.sidebar.radio("Menu", ["Users", "Imports/Exports", "Database", "Performance", "Logout"])
+    get_perf().set_route(f"admin/{menu}")
     
     if menu == "Users":
         st.title("👥 Users")
@@ -1134,8 +820,8 @@ def route_admin_panel():
                 with st.expander(f"{u['name']} ({u['team']})"):
                     with st.form(f"eu_{u['id']}"):
                         nn = st.text_input("Name", u['name']); nt = st.selectbox("Team", list(TEAMS.keys()), index=list(TEAMS.keys()).index(u['team']) if u['team'] in TEAMS else 0); na = st.checkbox("Active", u['is_active'])
-                        if st.form_submit_button("Update"): update_user(u['id'], nn, nt, na); st.success("Updated"); st.rerun()
-                    if st.button("Delete", key=f"del_{u['id']}"): delete_user(u['id']); st.success("Deleted"); st.rerun()
+                        if st.form_submit_button("Update"): update_user(int(u['id']), nn, nt, na); st.success("Updated"); st.rerun()
+                    if st.button("Delete", key=f"del_{u['id']}"): delete_user(int(u['id'])); st.success("Deleted"); st.rerun()
     elif menu == "Imports/Exports":
         st.title("📤 Data Tools")
         
@@ -1149,82 +835,121 @@ def route_admin_panel():
         uploaded_proj = st.file_uploader("Upload Projects CSV", type="csv", key="proj_up")
         if uploaded_proj:
             try:
-                try: df_p = pd.read_csv(uploaded_proj)
+                try: df_p = pd.read_csv(uploaded_proj, dtype=str)
                 except: 
                     uploaded_proj.seek(0)
-                    df_p = pd.read_csv(uploaded_proj, encoding='cp1252')
+                    df_p = pd.read_csv(uploaded_proj, encoding='cp1252', dtype=str)
                 
-                st.dataframe(df_p.head())
+                rows, rejected = normalize_project_import(df_p)
+                diff = diff_project_import(rows)
+                m1, m2, m3, m4 = st.columns(4)
+                m1.metric("New", int((diff['action'] == "insert").sum()))
+                m2.metric("Updated", int((diff['action'] == "update").sum()))
+                m3.metric("Unchanged", int((diff['action'] == "unchanged").sum()))
+                m4.metric("Rejected", len(rejected))
+                with st.expander("Dry run: pending changes"):
+                    st.dataframe(diff.loc[diff['action'] != "unchanged", ['action', 'project_code', 'project_name', 'changes']], hide_index=True, use_container_width=True)
+                if not rejected.empty:
+                    with st.expander("Rejected rows"): st.dataframe(rejected, use_container_width=True)
                 if st.button("Confirm Project Import"):
-                    count = 0
-                    for _, r in df_p.iterrows(): 
-                        upsert_project_import(r.to_dict())
-                        count += 1
-                    st.success(f"Imported {count} projects!")
+                    ins, upd = apply_project_import(rows)
+                    st.success(f"Imported projects: {ins} new, {upd} updated")
             except Exception as e: st.error(str(e))
 
         st.markdown("---")
         st.subheader("Import Incidents (CSV)")
         
-        inc_template_cols = ['inc_number', 'title', 'description', 'status', 'priority', 'notes', 'cah_manager', 'assigned_bts_member', 'affected_user', 'ssd_it_assigned_to', 'source_category', 'specific_source', 'issue_type', 'sn_comments', 'bts_notes', 'mrn', 'workaround', 'resolution', 'date_ticket_created', 'date_received_bts', 'date_escalated_dt', 'date_reported_epic']
-        inc_temp_df = pd.DataFrame(columns=inc_template_cols)
+        st.caption("Rows are matched on inc_number: tickets already on file are updated, new ones are added.")
+        inc_temp_df = pd.DataFrame(columns=INCIDENT_IMPORT_COLUMNS)
         st.download_button("Download Incident Template", inc_temp_df.to_csv(index=False).encode('utf-8'), "incident_import_template.csv", "text/csv")
 
         uploaded_file = st.file_uploader("Upload Incidents", type="csv")
         if uploaded_file:
             try:
-                try: df = pd.read_csv(uploaded_file)
-                except: 
-                    uploaded_file.seek(0)
-                    df = pd.read_csv(uploaded_file, encoding='cp1252')
                 if st.button("Confirm Incident Import"):
-                    for _, r in df.iterrows(): upsert_incident(r.to_dict())
-                    st.success("Done")
+                    bar = st.progress(0.0, text="Importing...")
+                    res = import_incidents_csv(uploaded_file, progress=lambda n, frac: bar.progress(frac, text=f"{n:,} rows read"))
+                    bar.empty()
+                    st.success(f"Imported {res['rows'] - res['rejected']:,} of {res['rows']:,} rows: {res['inserted']:,} new, {res['updated']:,} updated")
+                    if res['ignored_columns']: st.warning(f"Ignored unknown columns: {', '.join(map(str, res['ignored_columns']))}")
+                    if res['rejected']:
+                        st.warning(f"{res['rejected']:,} row(s) rejected")
+                        st.dataframe(res['rejected_rows'], use_container_width=True)
             except Exception as e: st.error(str(e))
             
         st.markdown("---")
         st.subheader("Export Database Tables")
         
-        c1,c2,c3 = st.columns(3)
-        with c1:
-            inc_csv = get_incidents().to_csv(index=False).encode('utf-8')
-            st.download_button("📥 Incidents", inc_csv, "incidents.csv", use_container_width=True)
-            
-            proj_df = get_projects()
-            if not proj_df.empty:
-                proj_df['assigned_members'] = proj_df['assigned_members'].apply(lambda x: ", ".join(x) if isinstance(x, list) else "")
-            proj_csv = proj_df.to_csv(index=False).encode('utf-8')
-            st.download_button("📥 Projects", proj_csv, "projects.csv", use_container_width=True)
-
-        with c2:
-            log_csv = get_time_logs().to_csv(index=False).encode('utf-8')
-            st.download_button("📥 Time Logs", log_csv, "timelogs.csv", use_container_width=True)
-            
-            users_csv = get_users(active_only=False).to_csv(index=False).encode('utf-8')
-            st.download_button("📥 Users", users_csv, "users.csv", use_container_width=True)
-
-        with c3:
-            conn = get_db_connection()
-            hist_df = pd.read_sql_query("SELECT * FROM project_updates", conn)
-            conn.close()
-            hist_csv = hist_df.to_csv(index=False).encode('utf-8')
-            st.download_button("📥 Project History", hist_csv, "project_history.csv", use_container_width=True)
+        st.caption("Exports are built on request and streamed from the database in chunks.")
+        e1, e2 = st.columns(2)
+        what = e1.selectbox("Table", list(EXPORTS) + ["All tables (zip)"])
+        fmt = e2.selectbox("Format", list(export_formats()))
+        table = None if what == "All tables (zip)" else what
+        def build_export(table=table, fmt=fmt):
+            # Runs only when the button is clicked; the temp file is removed once it has been read.
+            path, _ = export_to_file(table, fmt)
+            try:
+                with open(path, 'rb') as fh: return fh.read()
+            finally: os.remove(path)
+        fname = export_file_name(table, fmt)
+        st.download_button(f"📥 {fname}", build_export, fname, on_click="ignore", use_container_width=True)
+
+    elif menu == "Database":
+        st.title("🗄️ Database")
+        st.subheader("Query Plans")
+        st.caption("SQLite's EXPLAIN QUERY PLAN for each data-access query. Full scans and temp-table sorts mean a query is not served by an index.")
+        plans = explain_query_plans()
+        st.dataframe(plans[['query', 'full_scan', 'temp_sort', 'plan']], hide_index=True, use_container_width=True)
+        st.download_button("📥 Query Plans", plans.to_csv(index=False).encode('utf-8'), "query_plans.csv")
+        st.markdown("---")
+        st.subheader("Maintenance")
+        st.caption("Time-log rollups are kept current as hours are logged. Rebuild them after loading time logs outside the app.")
+        if st.button("Rebuild Time Rollups"):
+            daily, weekly = rebuild_time_rollups()
+            st.success(f"Rebuilt {daily} daily and {weekly} weekly rollup rows.")
+
+    elif menu == "Performance":
+        st.title("⏱️ Performance")
+        perf = get_perf()
+        calls, runs = perf.frames()
+        st.caption(f"Data-access timings for the last {len(calls)} calls and {len(runs)} reruns in this server process. "
+                   f"Queries are SQL statements executed; cached reads that hit run only the version check.")
+        c1, c2, _ = st.columns([1, 1, 4])
+        c1.download_button("📥 Export JSON", perf.to_json().encode('utf-8'), "athelas_perf.json", "application/json")
+        if c2.button("Reset"): perf.clear(); st.rerun()
+        if calls.empty: st.info("Nothing recorded yet.")
+        else:
+            qc = get_query_cache()
+            st.metric("Query cache hit ratio", f"{100.0 * qc.hits / max(qc.hits + qc.misses, 1):.0f}%")
+            st.subheader("By Function")
+            st.dataframe(perf.function_stats(), hide_index=True, use_container_width=True)
+            st.subheader("By Route")
+            st.dataframe(perf.route_stats(), hide_index=True, use_container_width=True)
+            st.subheader("Slowest Reruns")
+            slow = runs.nlargest(10, 'ms').assign(started=lambda r: pd.to_datetime(r['started'], unit='s'), n_plus_one=lambda r: r['n_plus_one'].map(lambda d: ", ".join(f"{f} ×{n}" for f, n in d.items())))
+            st.dataframe(slow, hide_index=True, use_container_width=True)
+            st.subheader("N+1 Suspects")
+            st.caption(f"Functions that ran queries {PERF_N_PLUS_ONE} or more times within a single rerun.")
+            n1 = pd.DataFrame([{"run": r.run, "route": r.route, "function": f, "calls": n} for r in runs.itertuples() for f, n in r.n_plus_one.items()])
+            if n1.empty: st.success("None detected.")
+            else: st.dataframe(n1.sort_values("calls", ascending=False), hide_index=True, use_container_width=True)
 
     elif menu == "Logout": st.session_state.page = "home"; st.rerun()
 
 # --- MAIN ---
 def main():
-    init_db()
+    ensure_db(DB_FILE)
     if 'page' not in st.session_state: st.session_state.page = "home"
     if 'curr_user_id' not in st.session_state: st.session_state.curr_user_id = None
     if 'dash_edit_id' not in st.session_state: st.session_state.dash_edit_id = None
     if 'inc_edit_id' not in st.session_state: st.session_state.inc_edit_id = None
 
-    if st.session_state.page == "home": landing_page()
-    elif st.session_state.page == "incidents": route_incidents()
-    elif st.session_state.page == "projects": route_projects()
-    elif st.session_state.page == "admin_auth": route_admin_auth()
-    elif st.session_state.page == "admin_panel": route_admin_panel()
+    with get_perf().rerun(st.session_state.page):
+        if st.session_state.page == "home": landing_page()
+        elif st.session_state.page == "incidents": route_incidents()
+        elif st.session_state.page == "projects": route_projects()
+        elif st.session_state.page == "admin_auth": route_admin_auth()
+        elif st.session_state.page == "admin_panel": route_admin_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
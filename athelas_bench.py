@@ -0,0 +1,244 @@
+"""Synthetic data generator and headless benchmarks for the Athelas data-access layer.
+
+    python athelas_bench.py --scale small medium --out bench_results.json
+    python athelas_bench.py --scale large --repeat 3 --compare bench_results.json
+    python athelas_bench.py --generate-only --scale large --db large.db
+
+Each scale builds a fresh database with a fixed seed, so runs on different builds time the same
+data and their results files can be compared with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import athelas_data
+
+# Row counts per scale. "large" is roughly a few years of production use.
+SCALES = {
+    "small":  dict(users=40,  projects=200,  incidents=5_000,   time_logs=50_000,    milestones=6, reports=4, history=10),
+    "medium": dict(users=150, projects=1_000, incidents=50_000,  time_logs=500_000,   milestones=8, reports=8, history=20),
+    "large":  dict(users=400, projects=5_000, incidents=200_000, time_logs=2_000_000, milestones=8, reports=12, history=30),
+}
+SEED = 20250101
+SPAN_DAYS = 730  # generated activity covers the two years before BASE_DATE
+BASE_DATE = date(2025, 12, 31)
+BATCH_ROWS = 50_000
+
+WORDS = ["printer", "epic", "login", "password", "referral", "hospice", "schedule", "visit", "fax", "scanner", "portal",
+         "billing", "order", "dme", "oxygen", "wound", "tablet", "vpn", "badge", "queue", "report", "workflow", "access", "error"]
+HEALTH = ["On Track", "On Track", "On Track", "At Risk", "Off Track"]
+CATEGORIES = ["Dev", "Meeting", "Doc", "Support", "Other"]
+
+def _day(rng):
+    return BASE_DATE - timedelta(days=rng.randrange(SPAN_DAYS))
+
+def _stamp(rng):
+    return datetime.combine(_day(rng), datetime.min.time()) + timedelta(seconds=rng.randrange(86400))
+
+def _batched(conn, sql, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_ROWS:
+            conn.executemany(sql, batch); batch.clear()
+    if batch: conn.executemany(sql, batch)
+
+def generate(path, users, projects, incidents, time_logs, milestones, reports, history, seed=SEED):
+    """Create a fresh database at path with the given row counts; the same arguments always give the same data."""
+    athelas_data.get_pool(path).close_all()  # pooled connections would keep the old file and its WAL alive
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix): os.remove(path + suffix)
+    athelas_data.DB_FILE = path
+    athelas_data.init_db()
+    rng = random.Random(seed)
+    conn = athelas_data.get_db_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        teams = list(athelas_data.TEAMS)
+        conn.executemany("INSERT INTO users (name, team, is_active) VALUES (?, ?, ?)",
+                         [(f"Bench User {i:04d}", "BTS" if i % 4 == 0 else rng.choice(teams), int(rng.random() > 0.05)) for i in range(users)])
+        user_ids = [r[0] for r in conn.execute("SELECT id FROM users")]
+        names = [r[0] for r in conn.execute("SELECT name FROM users WHERE team = 'BTS'")]
+
+        seq = {(t, ty, y): n for t, y, ty, n in conn.execute("SELECT team, year, type, last_seq FROM project_code_sequences")}
+        rows = []
+        for i in range(projects):
+            team, ptype, year = rng.choice(teams), rng.choice(list(athelas_data.PROJECT_TYPES)), rng.choice([2024, 2025])
+            seq[(team, ptype, year)] = seq.get((team, ptype, year), 0) + 1
+            start = _day(rng)
+            rows.append((f"Bench Project {i:05d} {rng.choice(WORDS).title()}", athelas_data.format_project_code(team, ptype, year, seq[(team, ptype, year)]),
+                         "Generated benchmark project", rng.choice(names),
+                         rng.choices(athelas_data.PROJECT_STATUS_OPTIONS, [2, 5, 1, 2, 1])[0], start.isoformat(), (start + timedelta(days=rng.randrange(60, 400))).isoformat(),
+                         float(rng.choice([0, 40, 80, 200, 500, 1000])), rng.choice(["Low", "Medium", "High", "Critical"]), _stamp(rng).isoformat(" ")))
+        conn.executemany("""INSERT INTO projects (project_name, project_code, description, project_manager, status, start_date,
+                            target_end_date, budget_hours, priority, created_at) VALUES (?,?,?,?,?,?,?,?,?,?)""", rows)
+        project_ids = [r[0] for r in conn.execute("SELECT id FROM projects")]
+        conn.executemany("INSERT OR IGNORE INTO project_members (project_id, user_name) VALUES (?, ?)",
+                         [(pid, name) for pid in project_ids for name in rng.sample(names, min(4, len(names)))])
+
+        _batched(conn, """INSERT INTO project_milestones (project_id, group_name, milestone_name, percent_complete, start_date, end_date, comments, status)
+                          VALUES (?,?,?,?,?,?,?,?)""",
+                 ((pid, f"Phase {m // 3 + 1}", f"Milestone {m + 1}", rng.choice([0, 25, 50, 80, 100]), _day(rng).isoformat(), None, "Generated", rng.choice(HEALTH))
+                  for pid in project_ids for m in range(milestones)))
+        _batched(conn, """INSERT INTO status_reports (project_id, report_date, next_report_date, health_scope, health_schedule, health_budget, health_resources,
+                          health_quality, health_overall, executive_summary, accomplishments, next_steps) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)""",
+                 ((pid, d.isoformat(), (d + timedelta(days=14)).isoformat(), *(rng.choice(HEALTH) for _ in range(6)),
+                   "Generated summary " + " ".join(rng.choices(WORDS, k=30)), "• " + " ".join(rng.choices(WORDS, k=8)), "• " + " ".join(rng.choices(WORDS, k=8)))
+                  for pid in project_ids for d in sorted(_day(rng) for _ in range(reports))))
+        _batched(conn, "INSERT INTO project_updates (project_id, update_type, user_name, update_text, created_at) VALUES (?,?,?,?,?)",
+                 ((pid, rng.choice(["Status Update", "Status Change", "Time Logged"]), rng.choice(names), " ".join(rng.choices(WORDS, k=8)), _stamp(rng).isoformat(" "))
+                  for pid in project_ids for _ in range(history)))
+
+        _batched(conn, """INSERT INTO incidents (inc_number, title, description, status, priority, assigned_bts_member, source_category, issue_type,
+                          date_ticket_created, project_id, created_at) VALUES (?,?,?,?,?,?,?,?,?,?,?)""",
+                 ((f"INC{9_000_000 + i}", " ".join(rng.choices(WORDS, k=5)).capitalize(), " ".join(rng.choices(WORDS, k=25)),
+                   rng.choices(athelas_data.STATUS_OPTIONS, [1, 2, 1, 4, 6])[0], rng.choice(["Low", "Medium", "High"]),
+                   rng.choice(names) if rng.random() > 0.15 else "", rng.choice(athelas_data.SOURCE_CATEGORIES), rng.choice(athelas_data.ISSUE_TYPES),
+                   _day(rng).isoformat(), rng.choice(project_ids) if rng.random() < 0.1 else None, _stamp(rng).isoformat(" "))
+                  for i in range(incidents)))
+
+        _batched(conn, "INSERT INTO time_logs (project_id, user_id, date, hours, description, category) VALUES (?,?,?,?,?,?)",
+                 ((rng.choice(project_ids), rng.choice(user_ids), _day(rng).isoformat(), rng.choice([0.25, 0.5, 1.0, 1.5, 2.0, 4.0, 8.0]),
+                   rng.choice(WORDS), rng.choice(CATEGORIES)) for _ in range(time_logs)))
+        conn.commit()
+    finally: conn.close()
+    athelas_data.rebuild_time_rollups()
+    conn = athelas_data.get_db_connection()
+    try: conn.execute("ANALYZE")
+    finally: conn.close()
+
+def benchmarks():
+    """(name, callable) pairs. Cached readers are timed through .uncached so every repeat runs its SQL."""
+    a = athelas_data
+    conn = a.get_db_connection()
+    try:
+        pid = conn.execute("SELECT project_id FROM time_logs GROUP BY project_id ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+        uid = conn.execute("SELECT user_id FROM time_logs GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+        iid = conn.execute("SELECT MAX(id) FROM incidents").fetchone()[0]
+        member = conn.execute("SELECT user_name FROM project_members GROUP BY user_name ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+    finally: conn.close()
+    projs = a.get_projects.uncached()
+    active = projs[projs['status'] == 'Active']
+    active_ids = active['id'].tolist()
+    today = BASE_DATE.isoformat()
+    month_ago = (BASE_DATE - timedelta(days=30)).isoformat()
+    latest = a.get_latest_status_reports.uncached(active_ids)
+    a._status_card_cache().clear()
+    history_cursor = None
+    for _ in range(19):
+        _, history_cursor = a.get_project_history.uncached(pid, before=history_cursor)
+        if history_cursor is None: break
+
+    def status_rollup():
+        a._status_card_cache().clear()
+        return a.load_status_rollup(active, latest)
+
+    return [
+        ("get_users", lambda: a.get_users.uncached(active_only=False)),
+        ("get_user", lambda: a.get_user.uncached(uid)),
+        ("get_projects", lambda: a.get_projects.uncached()),
+        ("get_project", lambda: a.get_project.uncached(pid)),
+        ("get_lookup", lambda: a.get_lookup.uncached()),
+        ("get_milestones", lambda: a.get_milestones.uncached(pid)),
+        ("get_milestones_for_projects[active]", lambda: a.get_milestones_for_projects.uncached(active_ids)),
+        ("get_latest_status_report", lambda: a.get_latest_status_report.uncached(pid)),
+        ("get_latest_status_reports[active]", lambda: a.get_latest_status_reports.uncached(active_ids)),
+        ("get_project_history[first page]", lambda: a.get_project_history.uncached(pid)),
+        ("get_project_history[page 20]", lambda: a.get_project_history.uncached(pid, before=history_cursor)),
+        ("get_project_history[Time Logged]", lambda: a.get_project_history.uncached(pid, "Time Logged")),
+        ("get_time_logs[project]", lambda: a.get_time_logs.uncached(pid)),
+        ("get_time_logs[all]", lambda: a.get_time_logs.uncached()),
+        ("get_user_time_logs", lambda: a.get_user_time_logs.uncached(uid)),
+        ("get_user_hours", lambda: a.get_user_hours.uncached(uid)),
+        ("get_member_projects", lambda: a.get_member_projects.uncached(member)),
+        ("get_incidents", lambda: a.get_incidents.uncached()),
+        ("get_incident", lambda: a.get_incident.uncached(iid)),
+        ("get_incident_metrics", lambda: a.get_incident_metrics.uncached()),
+        ("get_incident_aging[issue_type]", lambda: a.get_incident_aging.uncached(BASE_DATE, "issue_type")),
+        ("get_incident_page[open]", lambda: a.get_incident_page.uncached(["New", "In Progress", "On Hold"], [])),
+        ("get_incident_page[unfiltered]", lambda: a.get_incident_page.uncached()),
+        ("get_incident_ids[open]", lambda: a.get_incident_ids.uncached(["New", "In Progress", "On Hold"], [])),
+        ("search_incidents", lambda: a.search_incidents.uncached("printer epic")),
+        ("get_hours_totals", lambda: a.get_hours_totals.uncached()),
+        ("get_hours_totals[30d]", lambda: a.get_hours_totals.uncached(month_ago, today)),
+        *((f"get_hours_breakdown[{by}]", lambda by=by: a.get_hours_breakdown.uncached(by)) for by in a.ANALYTICS_BREAKDOWNS),
+        ("get_hours_breakdown[category,30d]", lambda: a.get_hours_breakdown.uncached("category", month_ago, today)),
+        ("get_budget_burn", lambda: a.get_budget_burn.uncached(today)),
+        ("preview_project_code", lambda: a.preview_project_code("BTS", "02", 2025)),
+        ("load_status_rollup[active]", status_rollup),
+    ]
+
+def time_call(fn, repeat):
+    fn()  # warm the page cache and any lazy state
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {"median_ms": statistics.median(times), "min_ms": min(times), "max_ms": max(times), "rows": athelas_data._result_rows(result)}
+
+def run_scale(scale, db, repeat, only=None):
+    counts = SCALES[scale]
+    t0 = time.perf_counter()
+    generate(db, **counts)
+    gen_s = time.perf_counter() - t0
+    print(f"[{scale}] generated {counts} in {gen_s:.1f}s", file=sys.stderr)
+    results = {}
+    for name, fn in benchmarks():
+        if only and not any(o in name for o in only): continue
+        results[name] = time_call(fn, repeat)
+        print(f"[{scale}] {name:40s} {results[name]['median_ms']:10.2f} ms  rows={results[name]['rows']}", file=sys.stderr)
+    return {"counts": counts, "generate_s": gen_s, "results": results}
+
+def compare(current, previous):
+    """Median-time ratios (current / previous) for every benchmark present in both runs."""
+    lines = []
+    for scale, run in current["scales"].items():
+        prev = previous.get("scales", {}).get(scale)
+        if not prev: continue
+        for name, r in run["results"].items():
+            p = prev["results"].get(name)
+            if p and p["median_ms"] > 0:
+                ratio = r["median_ms"] / p["median_ms"]
+                lines.append(f"{scale:7s} {name:40s} {p['median_ms']:10.2f} -> {r['median_ms']:10.2f} ms  x{ratio:.2f}{'  SLOWER' if ratio > 1.25 else ''}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scale", nargs="+", default=["small"], choices=list(SCALES))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--only", nargs="*", help="run only benchmarks whose name contains one of these")
+    ap.add_argument("--db", help="database path (default: a temp file per scale, removed afterwards)")
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--compare", help="earlier results file to compare against")
+    ap.add_argument("--generate-only", action="store_true", help="build the database and stop")
+    args = ap.parse_args(argv)
+
+    if args.generate_only:
+        for scale in args.scale: generate(args.db or f"athelas_{scale}.db", **SCALES[scale])
+        return
+    out = {"created": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+           "platform": platform.platform(), "repeat": args.repeat, "pragmas": athelas_data.DB_PRAGMAS, "scales": {}}
+    for scale in args.scale:
+        db = args.db or os.path.join(tempfile.gettempdir(), f"athelas_bench_{scale}.db")
+        try: out["scales"][scale] = run_scale(scale, db, args.repeat, args.only)
+        finally:
+            athelas_data.get_pool(db).close_all()
+            if not args.db:
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(db + suffix): os.remove(db + suffix)
+    with open(args.out, "w") as f: json.dump(out, f, indent=1)
+    print(f"Wrote {args.out}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare) as f: print(compare(out, json.load(f)))
+
+if __name__ == "__main__":
+    main()
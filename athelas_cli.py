@@ -0,0 +1,134 @@
+"""Command-line entry point for Athelas batch jobs. Uses only athelas_data, so it runs without Streamlit.
+
+    python athelas_cli.py migrate
+    python athelas_cli.py import-incidents incidents.csv --rejects rejects.csv
+    python athelas_cli.py import-projects projects.csv
+    python athelas_cli.py export incidents --format parquet --out /backups/incidents.parquet
+    python athelas_cli.py export all --format csv.gz
+    python athelas_cli.py rollups
+    python athelas_cli.py maintain --vacuum --check
+    python athelas_cli.py plans
+    python athelas_cli.py briefing --out briefing.html
+
+Every command brings the schema up to date first. --db picks the database file (default incidents.db).
+"""
+import argparse
+import shutil
+import sys
+
+import athelas_data as data
+
+EXPORT_FORMATS = {"csv": "CSV", "csv.gz": "CSV (gzip)", "parquet": "Parquet"}
+
+def _user_version():
+    conn = data.get_db_connection()
+    try: return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally: conn.close()
+
+def cmd_migrate(args):
+    print(f"Schema at version {_user_version()} of {len(data.MIGRATIONS)}")
+
+def cmd_import_incidents(args):
+    with open(args.file, "rb") as f:
+        r = data.import_incidents_csv(f, chunksize=args.chunksize, progress=lambda n, frac: print(f"  {n} rows ({frac:.0%})", file=sys.stderr))
+    print(f"{r['rows']} rows: {r['inserted']} inserted, {r['updated']} updated, {r['rejected']} rejected")
+    if r['ignored_columns']: print(f"Ignored columns: {', '.join(r['ignored_columns'])}")
+    if args.rejects and r['rejected']:
+        r['rejected_rows'].to_csv(args.rejects, index=False)
+        print(f"Rejected rows written to {args.rejects}")
+    return 1 if r['rejected'] and args.strict else 0
+
+def cmd_import_projects(args):
+    with open(args.file, "rb") as f:
+        df = data.pd.read_csv(f, dtype=str, encoding=data.sniff_csv_encoding(f))
+    rows, rejected = data.normalize_project_import(df)
+    if args.dry_run:
+        diff = data.diff_project_import(rows)
+        print(diff['action'].value_counts().to_string())
+    else:
+        inserted, updated = data.apply_project_import(rows, user_name=args.user)
+        print(f"{inserted} inserted, {updated} updated, {len(rejected)} rejected")
+    if len(rejected): print(rejected.to_string(), file=sys.stderr)
+    return 1 if len(rejected) and args.strict else 0
+
+def cmd_export(args):
+    fmt = EXPORT_FORMATS[args.format]
+    if args.table == "all":
+        path, name = data.export_to_file(None, fmt)
+        out = args.out or name
+        shutil.move(path, out)
+    else:
+        name = {stem: key for key, (stem, _) in data.EXPORTS.items()}[args.table]
+        out = args.out or args.table + data.export_formats()[fmt]
+        with open(out, "wb") as f: data.write_export(name, fmt, f)
+    print(f"Wrote {out}")
+
+def cmd_rollups(args):
+    daily, weekly = data.rebuild_time_rollups()
+    print(f"Rebuilt {daily} daily and {weekly} weekly rollup rows")
+
+def cmd_maintain(args):
+    r = data.maintain_db(vacuum=args.vacuum, check=args.check)
+    for k, v in r.items(): print(f"{k}: {v}")
+    return 1 if args.check and r["integrity_check"] != ["ok"] else 0
+
+def cmd_plans(args):
+    plans = data.explain_query_plans()
+    if not args.all: plans = plans[plans['full_scan'] | plans['temp_sort']]
+    for p in plans.itertuples(): print(f"{p.query}{'  [full scan]' if p.full_scan else ''}{'  [temp sort]' if p.temp_sort else ''}\n  " + p.plan.replace("\n", "\n  "))
+
+def cmd_briefing(args):
+    path = data.build_briefing(data.briefing_version())
+    if args.out: shutil.copyfile(path, args.out)
+    print(f"Wrote {args.out or path}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", default=data.DB_FILE, help="SQLite database file")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("migrate", help="apply pending schema migrations").set_defaults(fn=cmd_migrate)
+
+    p = sub.add_parser("import-incidents", help="upsert incidents from a CSV on inc_number")
+    p.add_argument("file")
+    p.add_argument("--chunksize", type=int, default=data.IMPORT_CHUNK_ROWS)
+    p.add_argument("--rejects", help="write rejected rows and reasons to this CSV")
+    p.add_argument("--strict", action="store_true", help="exit 1 if any row was rejected")
+    p.set_defaults(fn=cmd_import_incidents)
+
+    p = sub.add_parser("import-projects", help="upsert projects from a CSV on project_code")
+    p.add_argument("file")
+    p.add_argument("--user", default="Bulk Import", help="name recorded in project history")
+    p.add_argument("--dry-run", action="store_true", help="report inserts/updates without writing")
+    p.add_argument("--strict", action="store_true", help="exit 1 if any row was rejected")
+    p.set_defaults(fn=cmd_import_projects)
+
+    p = sub.add_parser("export", help="stream a table (or all of them, zipped) to a file")
+    p.add_argument("table", choices=[stem for stem, _ in data.EXPORTS.values()] + ["all"])
+    p.add_argument("--format", choices=list(EXPORT_FORMATS), default="csv")
+    p.add_argument("--out", help="output path (default: named after the table, in the current directory)")
+    p.set_defaults(fn=cmd_export)
+
+    sub.add_parser("rollups", help="rebuild the time-log rollup tables").set_defaults(fn=cmd_rollups)
+
+    p = sub.add_parser("maintain", help="ANALYZE, merge the search index and checkpoint the WAL")
+    p.add_argument("--vacuum", action="store_true", help="also VACUUM (rewrites the whole file)")
+    p.add_argument("--check", action="store_true", help="also run PRAGMA integrity_check; exit 1 on problems")
+    p.set_defaults(fn=cmd_maintain)
+
+    p = sub.add_parser("plans", help="show query plans that scan a table or sort in a temp B-tree")
+    p.add_argument("--all", action="store_true", help="show every query, not just flagged ones")
+    p.set_defaults(fn=cmd_plans)
+
+    p = sub.add_parser("briefing", help="render the Executive Status Briefing to HTML")
+    p.add_argument("--out", help="also copy it here (it is always kept in the briefing cache)")
+    p.set_defaults(fn=cmd_briefing)
+
+    args = ap.parse_args(argv)
+    data.DB_FILE = args.db
+    data.init_db()
+    try: return args.fn(args) or 0
+    finally: data.get_pool(data.DB_FILE).close_all()
+
+if __name__ == "__main__":
+    sys.exit(main())
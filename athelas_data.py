@@ -0,0 +1,1881 @@
+"""Athelas data layer: schema, migrations, connection pooling, caching and the business functions.
+
+Has no Streamlit dependency and imports pandas only when a function first needs it, so batch
+jobs and athelas_cli.py start quickly; athelas.py builds the UI on top of it. The pool, query
+cache and instrumentation are module-level, so they live as long as the process that imported
+this module (the Streamlit server, or one CLI run).
+"""
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+import time
+import json
+import re
+import os
+import queue
+import threading
+import weakref
+import io
+import gzip
+import zipfile
+import tempfile
+import shutil
+import importlib
+import importlib.util
+import codecs
+import copy
+import functools
+import hashlib
+import itertools
+import contextlib
+from collections import OrderedDict, deque, Counter
+from concurrent.futures import ThreadPoolExecutor
+import html
+
+class _LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+    def __init__(self, name):
+        self._name, self._module = name, None
+
+    def __getattr__(self, attr):
+        if self._module is None: self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+pd = _LazyModule("pandas")
+
+def _is_pandas(v, *kinds):
+    """isinstance against pandas classes without importing pandas just to find out."""
+    return "pandas" in sys.modules and isinstance(v, tuple(getattr(pd, k) for k in kinds))
+
+# --- Configuration & Constants ---
+
+DB_FILE = "incidents.db"
+
+# SQLite tuning; each value can be overridden with an ATHELAS_DB_<PRAGMA> environment variable.
+DB_PRAGMAS = {
+    "journal_mode": os.environ.get("ATHELAS_DB_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("ATHELAS_DB_SYNCHRONOUS", "NORMAL"),
+    "cache_size": int(os.environ.get("ATHELAS_DB_CACHE_SIZE", -64000)),  # negative = KiB
+    "mmap_size": int(os.environ.get("ATHELAS_DB_MMAP_SIZE", 256 * 1024 * 1024)),
+    "temp_store": os.environ.get("ATHELAS_DB_TEMP_STORE", "MEMORY"),
+}
+DB_POOL_SIZE = int(os.environ.get("ATHELAS_DB_POOL_SIZE", 16))
+
+# Instrumentation ring buffer sizes, and how many query-running calls to one function in a single
+# rerun count as an N+1 pattern.
+PERF_CALL_BUFFER = int(os.environ.get("ATHELAS_PERF_CALLS", 20000))
+PERF_RERUN_BUFFER = int(os.environ.get("ATHELAS_PERF_RERUNS", 500))
+PERF_N_PLUS_ONE = 5
+
+# --- Fixed Options ---
+SOURCE_CATEGORIES = ["Email", "Chat"]
+ISSUE_TYPES = ["Hardware", "Software", "Network", "Access/Permissions", "Workflow", "Training", "Data Error"]
+WORKAROUND_OPTIONS = ["Yes", "No", "Pending"]
+STATUS_OPTIONS = ["New", "In Progress", "On Hold", "Resolved", "Closed"]
+PROJECT_STATUS_OPTIONS = ["Planning", "Active", "On Hold", "Completed", "Cancelled"]
+HEALTH_COLORS = {"On Track": "🟢", "At Risk": "🟡", "Off Track": "🔴", "Not Started": "⚪", "Completed": "🔵"}
+
+# Reference Tables
+TEAMS = {
+    "AOP": "Agency Operations",
+    "BPF": "Business Performance",
+    "BTS": "Business and Technology Solutions",
+    "CAD": "Community Agency Division",
+    "CLX": "Clinical Excellence",
+    "DME": "Durable Medical Equipment",
+    "EXC": "Executives",
+    "HHC": "Home Health",
+    "HOS": "Hospice",
+    "MTS": "Medical Transportation Services",
+    "PBI": "Prebilling",
+    "RMH": "Referral Management Hub"
+}
+
+PROJECT_TYPES = {
+    "01": "Operations",
+    "02": "Technology",
+    "03": "Clinical",
+    "04": "Compliance",
+    "05": "Finance",
+    "06": "Strategy",
+    "07": "Training",
+    "08": "Data & Analytics",
+    "09": "Communications"
+}
+
+DEFAULT_BTS_MEMBERS = [
+    "Joshua Ay-Ad", "Linda Chow", "Aaron Gunewardena", "Katherine Mollure",
+    "Christine Antonio", "Annie Wongkovit", "Carla Santarromana"
+]
+
+# --- Instrumentation ---
+class PerfRecorder:
+    """Process-wide ring buffers of data-access timings, read by the admin Performance page.
+
+    Each instrumented call is stored as CALL_FIELDS: the rerun it ran in (None outside the app),
+    wall time, rows returned, SQL statements executed and cache use ("hit", "miss", or None for
+    uncached functions). Each rerun is stored as RUN_FIELDS when it finishes; n_plus_one maps
+    functions that ran queries PERF_N_PLUS_ONE or more times in that rerun to their call count.
+    """
+    CALL_FIELDS = ("run", "function", "ms", "rows", "queries", "cache")
+    RUN_FIELDS = ("run", "route", "started", "ms", "queries", "calls", "n_plus_one")
+
+    def __init__(self, calls=PERF_CALL_BUFFER, runs=PERF_RERUN_BUFFER):
+        self.calls = deque(maxlen=calls)
+        self.runs = deque(maxlen=runs)
+        self._ids = itertools.count(1)
+        self._local = threading.local()  # the script thread's current rerun and call stack
+
+    def _state(self):
+        s = self._local
+        if not hasattr(s, 'frames'): s.frames, s.run = [], None
+        return s
+
+    def on_statement(self):
+        s = self._state()
+        if s.frames: s.frames[-1][0] += 1
+        if s.run: s.run['queries'] += 1
+
+    @contextlib.contextmanager
+    def rerun(self, route):
+        s = self._state()
+        run = s.run = {"run": next(self._ids), "route": route, "started": time.time(), "queries": 0, "calls": 0, "querying": Counter()}
+        t0 = time.perf_counter()
+        try: yield
+        finally:
+            s.run = None
+            n_plus_one = {f: n for f, n in run['querying'].items() if n >= PERF_N_PLUS_ONE}
+            self.runs.append((run['run'], run['route'], run['started'], (time.perf_counter() - t0) * 1000, run['queries'], run['calls'], n_plus_one))
+
+    def set_route(self, route):
+        """Name the current rerun by the page and menu it rendered."""
+        run = self._state().run
+        if run: run['route'] = route
+
+    def enter(self):
+        frame = [0, None]  # queries, cache
+        self._state().frames.append(frame)
+        return frame
+
+    def cache_used(self, hit):
+        frames = self._state().frames
+        if frames: frames[-1][1] = "hit" if hit else "miss"
+
+    def exit(self, frame, function, ms, rows):
+        s = self._state()
+        if s.frames and s.frames[-1] is frame: s.frames.pop()
+        run = s.run
+        if run:
+            run['calls'] += 1
+            if frame[0]: run['querying'][function] += 1
+        self.calls.append((run['run'] if run else None, function, ms, rows, frame[0], frame[1]))
+
+    def clear(self):
+        self.calls.clear()
+        self.runs.clear()
+
+    def frames(self):
+        """(calls, runs) DataFrames; calls carry their rerun's route."""
+        calls = pd.DataFrame(list(self.calls), columns=self.CALL_FIELDS)
+        runs = pd.DataFrame(list(self.runs), columns=self.RUN_FIELDS)
+        calls['route'] = calls['run'].map(runs.set_index('run')['route']).fillna("(outside a rerun)")
+        return calls, runs
+
+    def function_stats(self, by="function"):
+        """Latency percentiles, rows, queries per call and cache hit ratio per function (or route)."""
+        calls, _ = self.frames()
+        g = calls.groupby(by)
+        return pd.DataFrame({
+            "calls": g.size(), "p50_ms": g['ms'].median(), "p95_ms": g['ms'].quantile(0.95), "max_ms": g['ms'].max(),
+            "avg_rows": g['rows'].mean(), "queries_per_call": g['queries'].mean(),
+            "cache_hit_pct": g['cache'].apply(lambda c: 100.0 * (c == "hit").sum() / c.notna().sum() if c.notna().any() else None),
+        }).sort_values("p95_ms", ascending=False).reset_index()
+
+    def route_stats(self):
+        """Rerun latency percentiles and query counts per route."""
+        _, runs = self.frames()
+        g = runs.groupby("route")
+        return pd.DataFrame({"reruns": g.size(), "p50_ms": g['ms'].median(), "p95_ms": g['ms'].quantile(0.95), "max_ms": g['ms'].max(),
+                             "avg_queries": g['queries'].mean(), "avg_calls": g['calls'].mean()}).sort_values("p95_ms", ascending=False).reset_index()
+
+    def to_json(self):
+        return json.dumps({"calls": [dict(zip(self.CALL_FIELDS, c)) for c in list(self.calls)],
+                           "runs": [dict(zip(self.RUN_FIELDS, r)) for r in list(self.runs)]})
+
+@functools.cache
+def get_perf():
+    return PerfRecorder()
+
+def _result_rows(v):
+    if isinstance(v, tuple) and v: v = v[0]  # (page, cursor) style results
+    if isinstance(v, list) or _is_pandas(v, "DataFrame"): return len(v)
+    if isinstance(v, dict) or _is_pandas(v, "Series"): return 1  # a single record
+    return None
+
+def instrumented(fn):
+    """Record each call's wall time, rows returned, queries run and cache use in get_perf()."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        perf = get_perf()
+        frame = perf.enter()
+        t0 = time.perf_counter()
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        finally: perf.exit(frame, fn.__name__, (time.perf_counter() - t0) * 1000, _result_rows(result))
+    return wrapper
+
+# --- Database Functions ---
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement it runs to its connection's on_statement hook."""
+    def execute(self, sql, parameters=()):
+        self.connection.on_statement()
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.connection.on_statement()
+        return super().executemany(sql, seq_of_parameters)
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool instead of closing it."""
+    pool = None
+    checked_out = False
+
+    def close(self):
+        if self.pool is None: super().close()
+        elif self.checked_out: self.pool.release(self)
+
+    def on_statement(self):
+        if self.pool is not None and self.pool.on_statement: self.pool.on_statement()
+
+    # Connection.execute() bypasses cursor(), so route both through TracedCursor.
+    def cursor(self, factory=None):
+        return super().cursor(factory or TracedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+class ConnectionPool:
+    """Long-lived, pre-configured connections shared by every session in the process.
+
+    Streamlit runs each rerun on a fresh thread, so connections are recycled through a
+    LIFO idle list rather than pinned to thread-locals: a thread holds one connection
+    between get_db_connection() and close(), and the next caller reuses it warm.
+    """
+    def __init__(self, path, pragmas, size=DB_POOL_SIZE, on_statement=None):
+        self.path, self.pragmas, self.on_statement = path, dict(pragmas), on_statement
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._open = weakref.WeakSet()  # weak, so a leaked connection is still closed (and unlocked) by GC
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, factory=PooledConnection)
+        conn.row_factory = sqlite3.Row
+        conn.pool = self
+        for k, v in self.pragmas.items(): conn.execute(f"PRAGMA {k}={v}")
+        with self._lock: self._open.add(conn)
+        return conn
+
+    def acquire(self):
+        try: conn = self._idle.get_nowait()
+        except queue.Empty: conn = self._connect()
+        conn.checked_out = True
+        return conn
+
+    def release(self, conn):
+        conn.checked_out = False
+        if conn.in_transaction: conn.rollback()
+        try: self._idle.put_nowait(conn)
+        except queue.Full:
+            with self._lock: self._open.discard(conn)
+            conn.pool = None
+            conn.close()
+
+    def close_all(self):
+        while not self._idle.empty(): self._idle.get_nowait()
+        with self._lock: conns, self._open = list(self._open), weakref.WeakSet()
+        for conn in conns:
+            conn.pool = None
+            conn.close()
+
+@functools.cache
+def get_pool(path):
+    return ConnectionPool(path, DB_PRAGMAS, on_statement=get_perf().on_statement)
+
+def get_db_connection():
+    """Borrow a pooled connection (WAL, row factory, busy timeout); close() returns it to the pool."""
+    return get_pool(DB_FILE).acquire()
+
+def _m001_base_schema(c):
+    # 1. Users
+    c.execute('''CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, team TEXT NOT NULL, is_active INTEGER DEFAULT 1, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    
+    # 2. Incidents
+    c.execute('''CREATE TABLE IF NOT EXISTS incidents (id INTEGER PRIMARY KEY AUTOINCREMENT, inc_number TEXT, title TEXT, description TEXT, status TEXT, priority TEXT, notes TEXT, cah_manager TEXT, assigned_bts_member TEXT, affected_user TEXT, ssd_it_assigned_to TEXT, source_category TEXT, specific_source TEXT, issue_type TEXT, sn_comments TEXT, bts_notes TEXT, mrn TEXT, workaround TEXT, resolution TEXT, date_ticket_created DATE, date_received_bts DATE, date_escalated_dt DATE, date_reported_epic DATE, project_id INTEGER, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+
+    # 3. Projects
+    c.execute('''CREATE TABLE IF NOT EXISTS projects (id INTEGER PRIMARY KEY AUTOINCREMENT, project_name TEXT NOT NULL, project_code TEXT UNIQUE, description TEXT, project_manager TEXT, business_owner TEXT, executive_sponsor TEXT, assigned_members TEXT, status TEXT DEFAULT 'Planning', start_date DATE, target_end_date DATE, actual_end_date DATE, budget_hours REAL, priority TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+
+    # 4. Time logs
+    c.execute('''CREATE TABLE IF NOT EXISTS time_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER NOT NULL, user_id INTEGER NOT NULL, date DATE NOT NULL, hours REAL NOT NULL, description TEXT, category TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE, FOREIGN KEY (user_id) REFERENCES users(id))''')
+
+    # 5. Project updates (History)
+    c.execute('''CREATE TABLE IF NOT EXISTS project_updates (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER NOT NULL, update_type TEXT NOT NULL, user_name TEXT, update_text TEXT, old_value TEXT, new_value TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE)''')
+
+    # 6. Milestones (NEW)
+    c.execute('''CREATE TABLE IF NOT EXISTS project_milestones (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER, group_name TEXT, milestone_name TEXT, percent_complete INTEGER DEFAULT 0, start_date DATE, end_date DATE, comments TEXT, status TEXT, FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE)''')
+
+    # 7. Status Reports (NEW)
+    c.execute('''CREATE TABLE IF NOT EXISTS status_reports (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER, report_date DATE, next_report_date DATE, health_scope TEXT, health_schedule TEXT, health_budget TEXT, health_resources TEXT, health_quality TEXT, health_overall TEXT, executive_summary TEXT, accomplishments TEXT, next_steps TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE)''')
+
+def _add_column(c, table, column, decl):
+    """ALTER TABLE ... ADD COLUMN, skipped when a pre-migration database already has it."""
+    if column not in [r['name'] for r in c.execute(f"PRAGMA table_info({table})")]:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+def _m002_incident_project_link(c):
+    _add_column(c, "incidents", "project_id", "INTEGER")
+
+def _m003_project_roles(c):
+    _add_column(c, "projects", "business_owner", "TEXT")
+    _add_column(c, "projects", "executive_sponsor", "TEXT")
+
+def _m004_seed_data(c):
+    # Defaults
+    c.execute("SELECT COUNT(*) as count FROM users")
+    if c.fetchone()['count'] == 0:
+        for member in DEFAULT_BTS_MEMBERS:
+            try: 
+                c.execute("INSERT INTO users (name, team, is_active) VALUES (?, ?, ?)", (member, 'BTS', 1))
+            except Exception as e: print(f"Error init users: {e}")
+
+    # Sample Projects
+    c.execute("SELECT COUNT(*) as count FROM projects")
+    if c.fetchone()['count'] == 0:
+        samples = [
+            ("AOP-25-0101", "Active Episodes – No SOC Workflow Optimization"),
+            ("AOP-25-0102", "Supply Checkout Process Standardization"),
+            ("BTS-25-0201", "eSmart File Manager"),
+            ("CLX-25-0701", "Care Experience All Stars"),
+            ("DME-25-0401", "DME CMS 2024 Alignment"),
+            ("DME-25-0201", "RPA: DME Referral Touchpoints"),
+            ("HHC-25-0101", "Kern Internalization"),
+            ("HOS-25-0101", "After Hours Care Services Optimization"),
+            ("MTS-25-0101", "Non-Scheduled 911 Activation Reduction"),
+            ("PBI-25-0501", "Pre-Billing Enhancements 2025")
+        ]
+        
+        mgr = DEFAULT_BTS_MEMBERS[0] 
+        
+        for code, name in samples:
+            try: 
+                c.execute('''INSERT INTO projects 
+                    (project_name, project_code, description, project_manager, status, start_date, budget_hours, priority) 
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', 
+                    (name, code, "2025 Strategic Initiative", mgr, "Active", "2025-01-01", 100.0, "High"))
+            except Exception as e: print(f"Error init projects: {e}")
+
+    # --- POPULATE RICH TEST DATA FOR "HOS-25-0101" ---
+    # Find the After Hours project ID
+    c.execute("SELECT id FROM projects WHERE project_code = 'HOS-25-0101'")
+    res = c.fetchone()
+    if res:
+        pid = res['id']
+        c.execute("SELECT count(*) as count FROM project_milestones WHERE project_id = ?", (pid,))
+        if c.fetchone()['count'] == 0:
+            milestones = [
+                (pid, "AHCS Re-alignment", "Collect & analyze data to identify gaps", 80, "2024-11-01", None, "Reviewed productivity data, call volume...", "On Track"),
+                (pid, "AHCS Re-alignment", "Evaluate Current Staffing Model", 90, "2024-11-01", None, "Evaluate staffing model per shift...", "On Track"),
+                (pid, "KPATHS", "Develop Clinical Protocols", 100, "2024-09-01", "2024-11-30", "Completed. Dr. Rosen & Dr. Wong approved.", "Completed"),
+                (pid, "KPATHS", "Develop Training Plan", 100, "2024-11-30", "2025-02-16", "Completed.", "Completed"),
+                (pid, "KPATHS", "System & Access", 100, "2024-08-01", "2025-02-16", "Training & In Production environment complete.", "Completed"),
+                (pid, "KPATHS", "Testing Phase", 100, "2025-03-03", "2025-03-31", "Validation occurred on 02/28.", "Completed"),
+                (pid, "KPATHS", "Maintenance/Enhancements", 60, "2025-03-17", None, "Gathering suggested enhancements.", "On Track"),
+                (pid, "24/7 Hour Model", "Data Collection & Needs Assessment", 100, "2025-01-27", "2025-09-25", "Completed data collection.", "Completed"),
+                (pid, "24/7 Hour Model", "Framework Development", 80, "2025-02-03", "2025-11-30", "Starting to map out staffing model.", "On Track")
+            ]
+            c.executemany("INSERT INTO project_milestones (project_id, group_name, milestone_name, percent_complete, start_date, end_date, comments, status) VALUES (?,?,?,?,?,?,?,?)", milestones)
+            
+            c.execute('''INSERT INTO status_reports 
+                (project_id, report_date, next_report_date, health_scope, health_schedule, health_budget, health_resources, health_quality, health_overall, executive_summary, accomplishments, next_steps)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                (pid, datetime.now().strftime('%Y-%m-%d'), (datetime.now() + timedelta(days=14)).strftime('%Y-%m-%d'),
+                 "On Track", "On Track", "On Track", "On Track", "On Track", "On Track",
+                 "The team is continuing to work on defining the implementation timeline and outline how the new team will be operationalized moving forward. Working on finalizing staffing model & timeline for future After Hours Care Services model with a focus on phase 1.",
+                 "• Re-identified the AHCS Operational Goals to align with KPATHS.\n• Completed data collection for needs assessment.",
+                 "• Re-communication & Accountability plan for in basket - pending\n• Finalize the HI AHCS Support Model\n• Update the framework of future model based on business case results")
+            )
+
+
+def _m005_data_versions(c):
+    c.execute("CREATE TABLE IF NOT EXISTS data_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)")
+
+# Blank and NULL assignees are shown (and filtered) as "Unassigned"; queries and the index use this expression verbatim.
+INCIDENT_ASSIGNEE_EXPR = "COALESCE(NULLIF(assigned_bts_member, ''), 'Unassigned')"
+INCIDENT_PAGE_SIZE = 50
+INCIDENT_CLOSED_STATUSES = ("Resolved", "Closed")
+# Ticket numbers are unique, except placeholders entered for tickets without one ("ID/NA" on the form).
+INCIDENT_PLACEHOLDERS = ('', 'NA', 'N/A', 'ID/NA')
+INCIDENT_KEYED = f"upper(inc_number) NOT IN {INCIDENT_PLACEHOLDERS}"
+
+INCIDENT_DATE_COLUMNS = ['date_ticket_created', 'date_received_bts', 'date_escalated_dt', 'date_reported_epic']
+# Days between timeline dates (generated columns, see _m012), shown in the incident lists and grid and
+# carried by SELECT * exports. Open age depends on today, so it is computed per query.
+INCIDENT_DURATIONS = {
+    "days_to_receive": "julianday(date_received_bts) - julianday(date_ticket_created)",
+    "days_to_escalate": "julianday(date_escalated_dt) - julianday(date_received_bts)",
+}
+
+# --- Incident aging ---
+INCIDENT_AGING_GROUPS = {
+    "overall": "'All incidents'",
+    "issue_type": "COALESCE(NULLIF(issue_type, ''), '(none)')",
+    "assigned_bts_member": INCIDENT_ASSIGNEE_EXPR,
+    "source_category": "COALESCE(NULLIF(source_category, ''), '(none)')",
+}
+# Review targets in days; within_sla is the share of incidents at or under the target.
+INCIDENT_SLA_DAYS = {"days_to_receive": 1, "days_to_escalate": 3, "open_age": 14}
+INCIDENT_PERCENTILES = (50, 90, 95)
+
+def _incident_aging_sql(group):
+    """Nearest-rank percentiles of each INCIDENT_SLA_DAYS metric per group, in one pass over ix_incidents_aging.
+
+    Params: as_of date (for open age), then the date_ticket_created range. Negative durations
+    (dates entered out of order) are left out. Durations are spelled out from INCIDENT_DURATIONS
+    rather than read from the generated columns so the index stays covering.
+    """
+    facts = " UNION ALL ".join(f"SELECT grp, '{m}' AS metric, {m} AS value FROM base" for m in INCIDENT_SLA_DAYS)
+    pcts = ", ".join(f"MAX(CASE WHEN rn = (n * {p} + 99) / 100 THEN value END) AS p{p}" for p in INCIDENT_PERCENTILES)
+    sla = " ".join(f"WHEN '{m}' THEN {days}" for m, days in INCIDENT_SLA_DAYS.items())
+    closed = ", ".join(f"'{s}'" for s in INCIDENT_CLOSED_STATUSES)
+    return f"""WITH base AS (
+        SELECT {group} AS grp, {', '.join(f"{expr} AS {name}" for name, expr in INCIDENT_DURATIONS.items())},
+               CASE WHEN status NOT IN ({closed}) THEN julianday(?) - julianday(date_ticket_created) END AS open_age
+        FROM incidents WHERE date_ticket_created BETWEEN COALESCE(?, '0000-01-01') AND COALESCE(?, '9999-12-31')),
+    ranked AS (
+        SELECT grp, metric, value, ROW_NUMBER() OVER w AS rn, COUNT(*) OVER (PARTITION BY grp, metric) AS n
+        FROM ({facts}) WHERE value >= 0
+        WINDOW w AS (PARTITION BY grp, metric ORDER BY value))
+    SELECT grp, metric, MAX(n) AS incidents, ROUND(AVG(value), 2) AS mean, {pcts}, MAX(value) AS max,
+           ROUND(AVG(value <= CASE metric {sla} END), 3) AS within_sla
+    FROM ranked GROUP BY grp, metric ORDER BY metric, incidents DESC, grp"""
+
+INCIDENT_IMPORT_COLUMNS = ['inc_number', 'title', 'description', 'status', 'priority', 'notes', 'cah_manager', 'assigned_bts_member', 'affected_user', 'ssd_it_assigned_to', 'source_category', 'specific_source', 'issue_type', 'sn_comments', 'bts_notes', 'mrn', 'workaround', 'resolution'] + INCIDENT_DATE_COLUMNS
+IMPORT_CHUNK_ROWS = 5000
+
+INCIDENT_SEARCH_COLUMNS = ["inc_number", "title", "description", "sn_comments", "bts_notes", "resolution", "mrn", "affected_user"]
+
+def _m006_incident_search(c):
+    # External-content FTS5 index over incidents, kept in sync by triggers.
+    cols = ", ".join(INCIDENT_SEARCH_COLUMNS)
+    new_vals = ", ".join(f"new.{col}" for col in INCIDENT_SEARCH_COLUMNS)
+    old_vals = ", ".join(f"old.{col}" for col in INCIDENT_SEARCH_COLUMNS)
+    c.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS incidents_fts USING fts5({cols}, content='incidents', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS incidents_fts_ai AFTER INSERT ON incidents BEGIN INSERT INTO incidents_fts(rowid, {cols}) VALUES (new.id, {new_vals}); END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS incidents_fts_ad AFTER DELETE ON incidents BEGIN INSERT INTO incidents_fts(incidents_fts, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS incidents_fts_au AFTER UPDATE ON incidents BEGIN INSERT INTO incidents_fts(incidents_fts, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); INSERT INTO incidents_fts(rowid, {cols}) VALUES (new.id, {new_vals}); END")
+    c.execute("INSERT INTO incidents_fts(incidents_fts) VALUES ('rebuild')")
+
+def _m007_unique_inc_number(c):
+    # Re-imports used to duplicate tickets. Keep the newest row under each number and suffix the
+    # older copies so nothing is lost and ux_incidents_inc_number can be built.
+    c.execute(f"""UPDATE incidents SET inc_number = inc_number || ' (dup ' || id || ')'
+                  WHERE {INCIDENT_KEYED} AND id NOT IN (SELECT MAX(id) FROM incidents WHERE {INCIDENT_KEYED} GROUP BY inc_number)""")
+
+# Monday of the week containing a date; the bucket used by time_rollup_weekly.
+TIME_ROLLUP_WEEK = "date({}, 'weekday 0', '-6 days')"
+
+def _rebuild_time_rollups(c):
+    c.execute("DELETE FROM time_rollup_daily")
+    c.execute("DELETE FROM time_rollup_weekly")
+    # Only time on existing projects by existing users counts (see _m013 for deletes).
+    live = "WHERE project_id IN (SELECT id FROM projects) AND user_id IN (SELECT id FROM users)"
+    c.execute(f"""INSERT INTO time_rollup_daily (project_id, user_id, date, hours, entries)
+                  SELECT project_id, user_id, date, SUM(hours), COUNT(*) FROM time_logs {live} GROUP BY project_id, user_id, date""")
+    c.execute(f"""INSERT INTO time_rollup_weekly (project_id, category, week, hours, entries)
+                  SELECT project_id, COALESCE(category, ''), {TIME_ROLLUP_WEEK.format('date')}, SUM(hours), COUNT(*)
+                  FROM time_logs {live} GROUP BY 1, 2, 3""")
+
+def _m008_time_log_rollups(c):
+    # Hours pre-aggregated per project/user/day and per project/category/week. log_time_entry()
+    # keeps them current in its own transaction; rebuild_time_rollups() recomputes them.
+    c.execute("""CREATE TABLE IF NOT EXISTS time_rollup_daily (project_id INTEGER NOT NULL, user_id INTEGER NOT NULL, date DATE NOT NULL,
+                 hours REAL NOT NULL DEFAULT 0, entries INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (project_id, user_id, date)) WITHOUT ROWID""")
+    c.execute("""CREATE TABLE IF NOT EXISTS time_rollup_weekly (project_id INTEGER NOT NULL, category TEXT NOT NULL, week DATE NOT NULL,
+                 hours REAL NOT NULL DEFAULT 0, entries INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (project_id, category, week)) WITHOUT ROWID""")
+    _rebuild_time_rollups(c)
+
+def _m009_time_log_user_ids(c):
+    # The user picker used to hand numpy ints to sqlite3, which stored them as 8-byte BLOBs;
+    # turn those back into integers so per-user lookups match.
+    fixed = [(int.from_bytes(r['user_id'], 'little', signed=True), r['id']) for r in c.execute("SELECT id, user_id FROM time_logs WHERE typeof(user_id) = 'blob'")]
+    if fixed:
+        c.executemany("UPDATE time_logs SET user_id = ? WHERE id = ?", fixed)
+        _rebuild_time_rollups(c)
+
+# Codes look like TEAM-YY-TTNN: team, two-digit year, two-digit type, then the sequence number.
+PROJECT_CODE_GLOB = "[A-Z][A-Z][A-Z]-[0-9][0-9]-[0-9][0-9][0-9][0-9]*"
+_PROJECT_CODE_SERIES = "substr({0}, 1, 3), 2000 + CAST(substr({0}, 5, 2) AS INTEGER), substr({0}, 8, 2)"
+_PROJECT_CODE_SEQ = "CAST(substr({0}, 10) AS INTEGER)"
+
+def _m010_project_code_sequences(c):
+    # Last issued sequence number per (team, year, type). allocate_project_code() takes numbers
+    # from here; the trigger keeps it ahead of codes written any other way (imports, older rows).
+    c.execute("CREATE TABLE IF NOT EXISTS project_code_sequences (team TEXT NOT NULL, year INTEGER NOT NULL, type TEXT NOT NULL, last_seq INTEGER NOT NULL, PRIMARY KEY (team, year, type)) WITHOUT ROWID")
+    c.execute(f"""INSERT INTO project_code_sequences (team, year, type, last_seq)
+                  SELECT {_PROJECT_CODE_SERIES.format('project_code')}, MAX({_PROJECT_CODE_SEQ.format('project_code')}) FROM projects
+                  WHERE project_code GLOB '{PROJECT_CODE_GLOB}' GROUP BY 1, 2, 3 ON CONFLICT DO UPDATE SET last_seq = max(last_seq, excluded.last_seq)""")
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS projects_code_seq_ai AFTER INSERT ON projects WHEN new.project_code GLOB '{PROJECT_CODE_GLOB}' BEGIN
+                  INSERT INTO project_code_sequences (team, year, type, last_seq) VALUES ({_PROJECT_CODE_SERIES.format('new.project_code')}, {_PROJECT_CODE_SEQ.format('new.project_code')})
+                  ON CONFLICT DO UPDATE SET last_seq = max(last_seq, excluded.last_seq); END""")
+
+def _m011_project_members(c):
+    # Project team membership by user name, replacing the projects.assigned_members JSON list.
+    c.execute("CREATE TABLE IF NOT EXISTS project_members (project_id INTEGER NOT NULL, user_name TEXT NOT NULL, PRIMARY KEY (project_id, user_name), FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE) WITHOUT ROWID")
+    if 'assigned_members' in {r['name'] for r in c.execute("PRAGMA table_info(projects)")}:
+        c.execute("""INSERT OR IGNORE INTO project_members (project_id, user_name)
+                     SELECT p.id, TRIM(j.value) FROM projects p, json_each(CASE WHEN json_valid(p.assigned_members) THEN p.assigned_members ELSE '[]' END) j
+                     WHERE TRIM(j.value) != ''""")
+        c.execute("ALTER TABLE projects DROP COLUMN assigned_members")
+    # foreign_keys is off, so the cascade is a trigger (covers delete_project and delete_records).
+    c.execute("CREATE TRIGGER IF NOT EXISTS projects_members_ad AFTER DELETE ON projects BEGIN DELETE FROM project_members WHERE project_id = old.id; END")
+
+def _m012_incident_durations(c):
+    # Timeline durations as virtual generated columns: computed on read, indexable, never stale.
+    have = {r['name'] for r in c.execute("PRAGMA table_xinfo(incidents)")}
+    for name, expr in INCIDENT_DURATIONS.items():
+        if name not in have: c.execute(f"ALTER TABLE incidents ADD COLUMN {name} REAL GENERATED ALWAYS AS ({expr}) VIRTUAL")
+
+def _m013_time_rollup_deletes(c):
+    # Deleting a project or user takes its hours out of the rollups (foreign keys are off, and
+    # time_logs rows are kept), so totals agree with the per-project and per-person breakdowns.
+    week = TIME_ROLLUP_WEEK.format('t.date')
+    w = "time_rollup_weekly"  # triggers cannot alias the updated table
+    user_logs = f"FROM time_logs t WHERE t.user_id = old.id AND t.project_id = {w}.project_id AND COALESCE(t.category, '') = {w}.category AND {week} = {w}.week"
+    c.execute("""CREATE TRIGGER IF NOT EXISTS projects_rollups_ad AFTER DELETE ON projects BEGIN
+                 DELETE FROM time_rollup_daily WHERE project_id = old.id; DELETE FROM time_rollup_weekly WHERE project_id = old.id; END""")
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS users_rollups_ad AFTER DELETE ON users BEGIN
+                  DELETE FROM time_rollup_daily WHERE user_id = old.id;
+                  UPDATE time_rollup_weekly SET hours = hours - (SELECT COALESCE(SUM(t.hours), 0) {user_logs}), entries = entries - (SELECT COUNT(*) {user_logs})
+                  WHERE EXISTS (SELECT 1 {user_logs});
+                  DELETE FROM time_rollup_weekly WHERE entries <= 0; END""")
+    _rebuild_time_rollups(c)
+
+def _m014_incident_fts_update_of(c):
+    # Reindex an incident only when a searchable column changes, not on every status or assignee edit.
+    cols = ", ".join(INCIDENT_SEARCH_COLUMNS)
+    new_vals = ", ".join(f"new.{col}" for col in INCIDENT_SEARCH_COLUMNS)
+    old_vals = ", ".join(f"old.{col}" for col in INCIDENT_SEARCH_COLUMNS)
+    c.execute("DROP TRIGGER IF EXISTS incidents_fts_au")
+    c.execute(f"CREATE TRIGGER incidents_fts_au AFTER UPDATE OF {cols} ON incidents BEGIN INSERT INTO incidents_fts(incidents_fts, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); INSERT INTO incidents_fts(rowid, {cols}) VALUES (new.id, {new_vals}); END")
+
+# Managed secondary indexes, matched to the query shapes in QUERIES. sync_indexes() creates
+# missing ones, rebuilds any whose definition changed and drops retired ones, so adding or
+# tuning an index is a one-line edit here. ix_* names are plain indexes, ux_* are UNIQUE.
+INDEXES = {
+    "ix_incidents_created": "incidents(created_at DESC, id DESC)",
+    "ux_incidents_inc_number": f"incidents(inc_number) WHERE {INCIDENT_KEYED}",
+    # Dashboard/Bulk filters with keyset paging: one (created_at, id) ordered walk per status. The trailing
+    # raw column lets SQLite check the assignee expression from the index (incident_page, incident_counts, incident_ids).
+    "ix_incidents_status_created": "incidents(status, created_at DESC, id DESC, assigned_bts_member)",
+    # Covering for the aging metrics, so they read the index rather than the wide incident rows.
+    # It holds the raw dates: SQLite (3.40) never treats virtual generated columns as covered.
+    "ix_incidents_aging": "incidents(date_ticket_created, status, issue_type, source_category, assigned_bts_member, date_received_bts, date_escalated_dt)",
+    "ix_projects_created": "projects(created_at DESC)",
+    # Projects a person is on (the primary key covers members of a project).
+    "ix_project_members_user": "project_members(user_name, project_id)",
+    "ix_time_logs_date": "time_logs(date DESC)",
+    # Covering for per-project hour totals as well as get_time_logs(pid).
+    "ix_time_logs_project_date": "time_logs(project_id, date DESC, user_id, hours)",
+    # Per-user recent entries and hour totals (Time Tracking).
+    "ix_time_logs_user_date": "time_logs(user_id, date DESC, hours)",
+    # Keyset pagination of project history, unfiltered and by update_type.
+    "ix_project_updates_project_created": "project_updates(project_id, created_at DESC, id DESC)",
+    "ix_project_updates_project_type_created": "project_updates(project_id, update_type, created_at DESC, id DESC)",
+    "ix_milestones_project_start": "project_milestones(project_id, start_date)",
+    "ix_status_reports_project_date": "status_reports(project_id, report_date DESC, id DESC)",
+    # Covering for date-bounded analytics over the daily rollup.
+    "ix_time_rollup_daily_date": "time_rollup_daily(date, project_id, user_id, hours)",
+}
+
+def sync_indexes(c):
+    """Make the managed ix_/ux_ indexes in the database match INDEXES."""
+    current = {r['name']: r['sql'] for r in c.execute("SELECT name, sql FROM sqlite_master WHERE type='index' AND (name LIKE 'ix\\_%' ESCAPE '\\' OR name LIKE 'ux\\_%' ESCAPE '\\')")}
+    for name, spec in INDEXES.items():
+        ddl = f"CREATE {'UNIQUE ' if name.startswith('ux_') else ''}INDEX {name} ON {spec}"
+        if current.pop(name, None) == ddl: continue
+        c.execute(f"DROP INDEX IF EXISTS {name}")
+        c.execute(ddl)
+    for name in current: c.execute(f"DROP INDEX {name}")
+
+# Tables whose writes bump a counter in data_versions (via tv_* triggers). The counters are
+# cheap, cross-process change tokens for anything cached on top of these tables.
+VERSIONED_TABLES = ("users", "incidents", "projects", "project_members", "time_logs", "project_updates", "project_milestones", "status_reports")
+
+def sync_version_triggers(c):
+    """Create the data_versions rows and tv_* triggers for VERSIONED_TABLES, dropping retired ones."""
+    current = {r['name'] for r in c.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND name LIKE 'tv\\_%' ESCAPE '\\'")}
+    for table in VERSIONED_TABLES:
+        c.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES (?, 0)", (table,))
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            name = f"tv_{table}_{op.lower()}"
+            current.discard(name)
+            c.execute(f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {op} ON {table} BEGIN UPDATE data_versions SET version = version + 1 WHERE name = '{table}'; END")
+    for name in current: c.execute(f"DROP TRIGGER {name}")
+
+def get_data_versions(*tables):
+    """Current change counters for the given VERSIONED_TABLES, as a tuple."""
+    conn = get_db_connection()
+    try: versions = dict(conn.execute("SELECT name, version FROM data_versions").fetchall())
+    finally: conn.close()
+    return tuple(versions.get(t, 0) for t in tables)
+
+# Ordered schema migrations; the database's PRAGMA user_version records how many have run.
+# Append new steps only, and keep each one idempotent so databases created before
+# versioning (user_version 0, tables already present) migrate cleanly.
+MIGRATIONS = [
+    _m001_base_schema,
+    _m002_incident_project_link,
+    _m003_project_roles,
+    _m004_seed_data,
+    _m005_data_versions,
+    _m006_incident_search,
+    _m007_unique_inc_number,
+    _m008_time_log_rollups,
+    _m009_time_log_user_ids,
+    _m010_project_code_sequences,
+    _m011_project_members,
+    _m012_incident_durations,
+    _m013_time_rollup_deletes,
+    _m014_incident_fts_update_of,
+]
+
+def init_db():
+    """Bring the database schema up to date, applying each pending migration in its own transaction."""
+    conn = get_db_connection()
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, step in enumerate(MIGRATIONS, start=1):
+            if target <= version: continue
+            conn.execute("BEGIN IMMEDIATE")
+            # Another process may have migrated while we waited for the write lock.
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= target:
+                conn.rollback(); continue
+            step(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        sync_indexes(conn.cursor())
+        sync_version_triggers(conn.cursor())
+        conn.commit()
+        conn.execute("PRAGMA optimize")
+    finally: conn.close()
+
+@functools.cache
+def ensure_db(path):
+    """Run init_db() once per process and database file rather than on every rerun."""
+    init_db()
+    return True
+
+@instrumented
+def maintain_db(vacuum=False, check=False):
+    """Routine upkeep: refresh planner statistics, merge the search index and checkpoint the WAL.
+    Optionally VACUUM and run an integrity check. Returns a dict describing what was done."""
+    conn = get_db_connection()
+    report = {}
+    try:
+        if check: report["integrity_check"] = [r[0] for r in conn.execute("PRAGMA integrity_check")]
+        conn.execute("ANALYZE")
+        conn.execute("INSERT INTO incidents_fts(incidents_fts) VALUES ('optimize')")
+        conn.commit()
+        if vacuum: conn.execute("VACUUM")
+        report["wal_checkpoint"] = tuple(conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone())
+        report["size_bytes"] = conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+    finally: conn.close()
+    return report
+
+# --- Query Cache ---
+class QueryCache:
+    """Process-wide cache of read results, each entry tagged with the table versions it was read at.
+
+    An entry is served while the versions still match, so results stay valid indefinitely and are
+    refreshed as soon as any process commits a write to one of the tables. Each (function, args)
+    keeps only its latest result, and the least recently used keys are evicted past max_entries.
+    """
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key, versions, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = (versions, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock: self._entries.clear()
+
+@functools.cache
+def get_query_cache():
+    return QueryCache()
+
+def _freeze(v):
+    """Hashable form of a cached function's argument."""
+    if isinstance(v, (list, tuple)): return tuple(_freeze(x) for x in v)
+    if isinstance(v, (set, frozenset)): return frozenset(_freeze(x) for x in v)
+    if isinstance(v, dict): return tuple(sorted((k, _freeze(x)) for k, x in v.items()))
+    if hasattr(v, 'item') and not isinstance(v, str): return v.item()  # numpy scalars
+    return v
+
+def _copy_result(v):
+    """Callers may mutate what they get back (as with st.cache_data), so hand out copies."""
+    if _is_pandas(v, "DataFrame", "Series"): return v.copy()
+    if isinstance(v, tuple): return tuple(_copy_result(x) for x in v)
+    if isinstance(v, (dict, list)): return copy.deepcopy(v)
+    return v
+
+def cached_query(*tables):
+    """Cache a read function until one of `tables` changes (by its data_versions counter)."""
+    def decorator(fn):
+        @instrumented
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (DB_FILE, fn.__qualname__, _freeze(args), _freeze(kwargs))
+            perf, missed = get_perf(), []
+            def compute():
+                missed.append(True)
+                return fn(*args, **kwargs)
+            value = get_query_cache().get(key, get_data_versions(*tables), compute)
+            perf.cache_used(hit=not missed)
+            return _copy_result(value)
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
+
+# --- Helper Functions ---
+def safe_date(val):
+    if pd.isna(val) or val == "" or val is None: return None
+    try: return datetime.strptime(str(val).split()[0], '%Y-%m-%d')
+    except: return None
+
+def format_project_code(team_code, type_code, year, seq):
+    return f"{team_code}-{str(year)[-2:]}-{type_code}{seq:02d}"
+
+@instrumented
+def preview_project_code(team_code, type_code, year):
+    """The code the next project in this series would get. Nothing is reserved; create_project() allocates."""
+    conn = get_db_connection()
+    try: row = conn.execute(QUERIES['project_code_sequence'], (team_code, int(year), type_code)).fetchone()
+    finally: conn.close()
+    return format_project_code(team_code, type_code, year, (row['last_seq'] if row else 0) + 1)
+
+def allocate_project_code(cursor, team_code, type_code, year):
+    """Take the next code in a series inside the caller's transaction; concurrent writers get distinct codes."""
+    cursor.execute("""INSERT INTO project_code_sequences (team, year, type, last_seq) VALUES (?, ?, ?, 1)
+                      ON CONFLICT DO UPDATE SET last_seq = last_seq + 1 RETURNING last_seq""", (team_code, int(year), type_code))
+    return format_project_code(team_code, type_code, year, cursor.fetchone()['last_seq'])
+
+# --- Data Access ---
+
+# Read queries of the data-access layer, by name. Functions run these exact strings and
+# explain_query_plans() reports SQLite's plan for each, so index coverage can be checked
+# against what actually executes. Filter variants are listed in their common shape.
+_ROLLUP_RANGE = "r.date BETWEEN COALESCE(?, '0000-01-01') AND COALESCE(?, '9999-12-31')"
+
+_TIME_LOG_SELECT = "SELECT t.id, t.date, t.hours, t.description, t.category, u.name as user_name, p.project_name, p.project_code, p.budget_hours FROM time_logs t JOIN users u ON t.user_id = u.id JOIN projects p ON t.project_id = p.id"
+_HISTORY_SELECT = "SELECT id, created_at, update_type, user_name, update_text FROM project_updates WHERE project_id = ?"
+_HISTORY_TYPED = " AND update_type = ?"
+_HISTORY_BEFORE = " AND (created_at, id) < (?, ?)"
+_HISTORY_PAGE = " ORDER BY created_at DESC, id DESC LIMIT ?"
+
+QUERIES = {
+    "users": "SELECT * FROM users WHERE is_active = 1 AND team = ? ORDER BY name",
+    "user": "SELECT * FROM users WHERE id=?",
+    "projects": "SELECT * FROM projects ORDER BY created_at DESC",
+    "project": "SELECT * FROM projects WHERE id=?",
+    "project_lookup": "SELECT id, project_code, project_name, status FROM projects ORDER BY created_at DESC",
+    "user_lookup": "SELECT id, name, team, is_active FROM users ORDER BY name",
+    # assigned_members as a name-sorted, compact JSON list, the form normalize_project_import() produces.
+    "projects_by_code": """SELECT p.*, (SELECT json_group_array(user_name) FROM (SELECT user_name FROM project_members m WHERE m.project_id = p.id ORDER BY user_name)) AS assigned_members
+                           FROM projects p WHERE project_code IN (SELECT value FROM json_each(?))""",
+    "project_members": "SELECT user_name FROM project_members WHERE project_id = ? ORDER BY user_name",
+    "member_projects": """SELECT p.id, p.project_code, p.project_name, p.status, p.target_end_date FROM project_members m JOIN projects p ON p.id = m.project_id
+                          WHERE m.user_name = ? ORDER BY p.created_at DESC""",
+    "project_ids_by_code": "SELECT project_code, id FROM projects WHERE project_code IN (SELECT value FROM json_each(?))",
+    "project_code_sequence": "SELECT last_seq FROM project_code_sequences WHERE team = ? AND year = ? AND type = ?",
+    "milestones": "SELECT * FROM project_milestones WHERE project_id=? ORDER BY start_date",
+    "milestones_for_projects": "SELECT * FROM project_milestones WHERE project_id IN (SELECT value FROM json_each(?)) ORDER BY project_id, start_date",
+    "latest_status_report": "SELECT * FROM status_reports WHERE project_id=? ORDER BY report_date DESC, id DESC LIMIT 1",
+    # Id lists are bound as one JSON array parameter, keeping the SQL text (and its plan) fixed.
+    "latest_status_reports": "SELECT * FROM (SELECT sr.*, ROW_NUMBER() OVER (PARTITION BY project_id ORDER BY report_date DESC, id DESC) AS rn FROM status_reports sr WHERE project_id IN (SELECT value FROM json_each(?))) WHERE rn = 1",
+    # Keyset pages, newest first: the *_before variants continue after a (created_at, id) cursor.
+    "project_history": _HISTORY_SELECT + _HISTORY_PAGE,
+    "project_history_before": _HISTORY_SELECT + _HISTORY_BEFORE + _HISTORY_PAGE,
+    "project_history_typed": _HISTORY_SELECT + _HISTORY_TYPED + _HISTORY_PAGE,
+    "project_history_typed_before": _HISTORY_SELECT + _HISTORY_TYPED + _HISTORY_BEFORE + _HISTORY_PAGE,
+    "project_history_types": "SELECT DISTINCT update_type FROM project_updates WHERE project_id = ? ORDER BY update_type",
+    "time_logs": _TIME_LOG_SELECT + " ORDER BY t.date DESC",
+    "time_logs_by_project": _TIME_LOG_SELECT + " WHERE t.project_id = ? ORDER BY t.date DESC",
+    "user_time_logs": "SELECT t.id, t.date, t.hours, t.description, t.category, p.project_name, p.project_code FROM time_logs t JOIN projects p ON t.project_id = p.id WHERE t.user_id = ? ORDER BY t.date DESC LIMIT ?",
+    "user_hours": "SELECT COALESCE(SUM(t.hours), 0) AS hours, COUNT(*) AS entries FROM time_logs t JOIN projects p ON p.id = t.project_id WHERE t.user_id = ?",
+    # Analytics. Open-ended date ranges bind NULL, which the COALESCE bounds turn into "no limit".
+    "hours_totals": f"SELECT COALESCE(SUM(hours), 0) AS hours, COUNT(DISTINCT user_id) AS contributors, COUNT(DISTINCT project_id) AS projects FROM time_rollup_daily r WHERE {_ROLLUP_RANGE}",
+    "hours_by_project": f"SELECT p.project_code, p.project_name, SUM(r.hours) AS hours FROM time_rollup_daily r JOIN projects p ON r.project_id = p.id WHERE {_ROLLUP_RANGE} GROUP BY r.project_id ORDER BY hours DESC",
+    "hours_by_person": f"SELECT u.name AS user_name, SUM(r.hours) AS hours FROM time_rollup_daily r JOIN users u ON r.user_id = u.id WHERE {_ROLLUP_RANGE} GROUP BY r.user_id ORDER BY hours DESC",
+    "hours_by_week": f"SELECT {TIME_ROLLUP_WEEK.format('r.date')} AS period, SUM(r.hours) AS hours FROM time_rollup_daily r WHERE {_ROLLUP_RANGE} GROUP BY 1 ORDER BY 1",
+    "hours_by_month": f"SELECT substr(r.date, 1, 7) AS period, SUM(r.hours) AS hours FROM time_rollup_daily r WHERE {_ROLLUP_RANGE} GROUP BY 1 ORDER BY 1",
+    # Categories are only rolled up by week, so a date-bounded breakdown reads the logs in range instead.
+    "hours_by_category": "SELECT COALESCE(NULLIF(category, ''), 'Uncategorized') AS category, SUM(hours) AS hours FROM time_rollup_weekly GROUP BY 1 ORDER BY hours DESC",
+    "hours_by_category_range": f"SELECT COALESCE(NULLIF(category, ''), 'Uncategorized') AS category, SUM(hours) AS hours FROM time_logs r WHERE {_ROLLUP_RANGE} GROUP BY 1 ORDER BY hours DESC",
+    # Lifetime hours against budget, plus the average weekly burn over the `window` days up to `as_of`.
+    "budget_burn": """SELECT *, budget_hours - logged_hours AS remaining_hours, ROUND(100.0 * logged_hours / NULLIF(budget_hours, 0), 1) AS burn_pct,
+                             (budget_hours - logged_hours) / NULLIF(burn_rate, 0) AS weeks_left
+                      FROM (SELECT p.id, p.project_code, p.project_name, p.status, p.budget_hours, COALESCE(SUM(r.hours), 0) AS logged_hours,
+                                   COALESCE(SUM(r.hours) FILTER (WHERE r.date > date(?, '-' || ? || ' days')), 0) * 7.0 / ? AS burn_rate
+                            FROM projects p LEFT JOIN time_rollup_daily r ON r.project_id = p.id AND r.date <= ? GROUP BY p.id)
+                      ORDER BY burn_pct DESC NULLS LAST, logged_hours DESC""",
+    "incidents": "SELECT * FROM incidents ORDER BY created_at DESC",
+    "incident": "SELECT * FROM incidents WHERE id=?",
+    "incident_page": f"SELECT * FROM (SELECT * FROM (SELECT id, inc_number, status, {INCIDENT_ASSIGNEE_EXPR} AS assigned_bts_member, title, date_ticket_created, created_at FROM incidents WHERE status = ? AND {INCIDENT_ASSIGNEE_EXPR} IN (SELECT value FROM json_each(?)) AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?)) ORDER BY created_at DESC, id DESC LIMIT ?",
+    "incident_ids": f"SELECT id FROM incidents WHERE status IN (SELECT value FROM json_each(?)) AND {INCIDENT_ASSIGNEE_EXPR} IN (SELECT value FROM json_each(?))",
+    "incident_numbers": f"SELECT inc_number FROM incidents WHERE inc_number IN (SELECT value FROM json_each(?)) AND {INCIDENT_KEYED}",
+    "incident_counts": f"SELECT status, {INCIDENT_ASSIGNEE_EXPR} AS assignee, COUNT(*) AS n FROM incidents GROUP BY status, {INCIDENT_ASSIGNEE_EXPR}",
+    **{f"incident_aging_{by}": _incident_aging_sql(expr) for by, expr in INCIDENT_AGING_GROUPS.items()},
+    "incident_search": "SELECT i.* FROM incidents_fts JOIN incidents i ON i.id = incidents_fts.rowid WHERE incidents_fts MATCH ? ORDER BY incidents_fts.rank LIMIT ?",
+    # Ticket numbers are single tokens, so a bare "12345" has no FTS prefix match on "INC0012345".
+    # Walks ux_incidents_inc_number in order, so LIMIT stops the scan without a sort.
+    "incident_number_search": f"SELECT * FROM incidents WHERE {INCIDENT_KEYED} AND inc_number LIKE ? ORDER BY inc_number LIMIT ?",
+}
+
+def _scans_table(details):
+    """True if a plan reads a stored table without an index. SCANs of table-valued functions
+    (json_each), FTS tables, subqueries and CTEs iterate results that are already bounded."""
+    derived = {d.split()[1] for d in details if d.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+    for d in details:
+        words = d.split()
+        if words[0] != "SCAN" or "USING" in words or "VIRTUAL TABLE" in d: continue
+        if words[1].startswith("(") or words[1] in derived or words[1:3] == ["CONSTANT", "ROW"]: continue
+        return True
+    return False
+
+@instrumented
+def explain_query_plans():
+    """EXPLAIN QUERY PLAN for every entry in QUERIES, one row per query."""
+    conn = get_db_connection()
+    rows = []
+    try:
+        for name, sql in QUERIES.items():
+            plan = conn.execute("EXPLAIN QUERY PLAN " + sql, [None] * sql.count("?")).fetchall()
+            depth = {0: 0}
+            lines = []
+            for r in plan:
+                depth[r['id']] = depth.get(r['parent'], 0) + 1
+                lines.append("  " * (depth[r['id']] - 1) + r['detail'])
+            rows.append({"query": name, "plan": "\n".join(lines), "full_scan": _scans_table([r['detail'] for r in plan]),
+                         "temp_sort": any("TEMP B-TREE" in l for l in lines), "sql": sql})
+    finally: conn.close()
+    return pd.DataFrame(rows)
+
+@cached_query("users")
+def get_users(active_only=True, team=None):
+    conn = get_db_connection()
+    q = "SELECT * FROM users"
+    conds, params = [], []
+    if active_only: conds.append("is_active = 1")
+    if team: 
+        conds.append("team = ?")
+        params.append(team)
+    if conds: q += " WHERE " + " AND ".join(conds)
+    q += " ORDER BY name"
+    df = pd.read_sql_query(q, conn, params=params)
+    conn.close()
+    return df
+
+@cached_query("users")
+def get_user(uid):
+    """One user as a dict, or None."""
+    conn = get_db_connection()
+    try:
+        row = conn.execute(QUERIES['user'], (int(uid),)).fetchone()
+        return dict(row) if row else None
+    finally: conn.close()
+
+@instrumented
+def create_user(name, team):
+    if not name or not team: return False
+    conn = get_db_connection()
+    try:
+        conn.execute("INSERT INTO users (name, team, is_active) VALUES (?, ?, 1)", (name, team))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error creating user: {e}")
+        return False
+    finally: conn.close()
+
+@instrumented
+def update_user(user_id, name, team, is_active):
+    conn = get_db_connection()
+    try:
+        conn.execute("UPDATE users SET name=?, team=?, is_active=? WHERE id=?", (name, team, is_active, user_id))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error updating user: {e}")
+        return False
+    finally: conn.close()
+
+@instrumented
+def delete_user(user_id):
+    conn = get_db_connection()
+    conn.execute("DELETE FROM users WHERE id=?", (user_id,))
+    conn.commit()
+    conn.close()
+
+@cached_query("projects")
+def get_projects():
+    conn = get_db_connection()
+    df = pd.read_sql_query(QUERIES['projects'], conn)
+    conn.close()
+    return df
+
+@cached_query("projects", "project_members")
+def get_project(project_id):
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute(QUERIES['project'], (project_id,))
+    res = c.fetchone()
+    if res:
+        d = dict(res)
+        d['assigned_members'] = [r[0] for r in c.execute(QUERIES['project_members'], (project_id,))]
+    conn.close()
+    return d if res else None
+
+@cached_query("projects", "project_members")
+def get_member_projects(user_name):
+    """Projects user_name is a team member of, newest first."""
+    conn = get_db_connection()
+    df = pd.read_sql_query(QUERIES['member_projects'], conn, params=(user_name,))
+    conn.close()
+    return df
+
+def set_project_members(cursor, teams):
+    """Replace the team of each project in teams ({project id: names}, names a list or JSON list), touching only rows that change."""
+    teams = [(int(pid), names if isinstance(names, str) else json.dumps(sorted({n.strip() for n in names if n and n.strip()})))
+             for pid, names in teams.items()]
+    cursor.executemany("DELETE FROM project_members WHERE project_id = ? AND user_name NOT IN (SELECT value FROM json_each(?))", teams)
+    cursor.executemany("INSERT OR IGNORE INTO project_members (project_id, user_name) SELECT ?, value FROM json_each(?)", teams)
+
+@instrumented
+def create_project(data):
+    """Insert a project; a new code is allocated from data['code_series'] (team, type, year) when given."""
+    series = data.get('code_series')
+    if not data['project_name'] or not (series or data['project_code']): return False
+    conn = get_db_connection()
+    c = conn.cursor()
+    if series: data['project_code'] = allocate_project_code(c, *series)
+    c.execute('''INSERT INTO projects (project_name, project_code, description, project_manager, business_owner, executive_sponsor, status, start_date, target_end_date, budget_hours, priority) 
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+              (data['project_name'], data['project_code'], data['description'], data['project_manager'], data['business_owner'], data['executive_sponsor'], data['status'], data['start_date'], data['target_end_date'], data['budget_hours'], data['priority']))
+    pid = c.lastrowid
+    set_project_members(c, {pid: data.get('assigned_members', [])})
+    log_project_update(c, pid, "Created", data.get('project_manager', 'System'), f"Project created: {data['project_name']}")
+    conn.commit()
+    conn.close()
+    return pid
+
+@instrumented
+def update_project(project_id, data, user_name="System"):
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute("SELECT status FROM projects WHERE id=?", (project_id,))
+    curr = c.fetchone()
+    if curr and curr['status'] != data['status']:
+        log_project_update(c, project_id, "Status Change", user_name, f"Status: {curr['status']} -> {data['status']}")
+    
+    c.execute('''UPDATE projects SET project_name=?, description=?, project_manager=?, business_owner=?, executive_sponsor=?, status=?, start_date=?, target_end_date=?, actual_end_date=?, budget_hours=?, priority=?, updated_at=CURRENT_TIMESTAMP WHERE id=?''',
+              (data['project_name'], data['description'], data['project_manager'], data['business_owner'], data['executive_sponsor'], data['status'], data['start_date'], data['target_end_date'], data.get('actual_end_date'), data['budget_hours'], data['priority'], project_id))
+    set_project_members(c, {project_id: data.get('assigned_members', [])})
+    conn.commit()
+    conn.close()
+
+@instrumented
+def delete_project(project_id):
+    conn = get_db_connection()
+    conn.execute("DELETE FROM projects WHERE id=?", (project_id,))
+    conn.commit()
+    conn.close()
+
+# --- Lookups ---
+class LookupIndex:
+    """Id, code and name maps over projects and users for pickers and labels. get_lookup() builds one
+    per data version and shares it across reruns, so treat it as read-only."""
+    def __init__(self, projects, users):
+        self.projects = {r['id']: r for r in projects}  # newest first, as the pickers list them
+        self.project_id_by_code = {r['project_code']: r['id'] for r in projects if r['project_code']}
+        self.project_id_by_name = {r['project_name']: r['id'] for r in projects}
+        self.users = {r['id']: r for r in users}  # in name order
+        self.user_id_by_name = {r['name']: r['id'] for r in users}
+
+    def project_label(self, pid):
+        p = self.projects.get(pid)
+        return f"{p['project_code']} - {p['project_name']}" if p else "None"
+
+    def user_names(self, team=None):
+        """Active user names, optionally for one team."""
+        return [u['name'] for u in self.users.values() if u['is_active'] and (team is None or u['team'] == team)]
+
+@cached_query("projects", "users")
+def get_lookup():
+    conn = get_db_connection()
+    try: return LookupIndex([dict(r) for r in conn.execute(QUERIES['project_lookup'])], [dict(r) for r in conn.execute(QUERIES['user_lookup'])])
+    finally: conn.close()
+
+# --- Bulk Project Import ---
+PROJECT_IMPORT_COLUMNS = ['project_name', 'project_code', 'description', 'project_manager', 'business_owner', 'executive_sponsor',
+                          'assigned_members', 'status', 'start_date', 'target_end_date', 'actual_end_date', 'budget_hours', 'priority']
+PROJECT_PRIORITIES = ["Low", "Medium", "High", "Critical"]
+PROJECT_CODE_RE = r"[A-Z]{3}-\d{2}-\d{4,}"
+
+def _blank_to_none(col):
+    col = col.map(lambda v: v.strip() or None if isinstance(v, str) else v)
+    return col.astype(object).where(col.notna(), None)  # map() turns None back into NaN
+
+def normalize_project_import(df):
+    """Validate and normalize an uploaded project frame column by column.
+
+    Returns (rows, rejected): rows holds the known columns in database form (ISO dates, float
+    budgets, assigned_members as a JSON list); rejected holds the bad input rows with a reason.
+    A code repeated in the file keeps its last row.
+    """
+    df = df.rename(columns=lambda c: str(c).strip())
+    rows = pd.DataFrame({c: _blank_to_none(df[c]) for c in PROJECT_IMPORT_COLUMNS if c in df.columns}, index=df.index)
+    reasons = pd.Series("", index=df.index)
+    def reject(mask, why): reasons.loc[mask & (reasons == "")] = why
+
+    if 'project_code' not in rows: rows['project_code'] = None
+    if 'project_name' not in rows: rows['project_name'] = None
+    rows['project_code'] = rows['project_code'].str.upper()
+    reject(rows['project_name'].isna(), "missing project_name")
+    reject(~rows['project_code'].fillna("").str.fullmatch(PROJECT_CODE_RE), "project_code must look like TEAM-YY-TTNN")
+    reject(rows['project_code'].duplicated(keep='last') & rows['project_code'].notna(), "superseded by a later row with the same code")
+
+    for col in ['start_date', 'target_end_date', 'actual_end_date']:
+        if col not in rows: continue
+        parsed = pd.to_datetime(rows[col], errors='coerce', format='mixed')
+        reject(rows[col].notna() & parsed.isna(), f"unreadable {col}")
+        rows[col] = parsed.dt.strftime('%Y-%m-%d').astype(object).where(parsed.notna(), None)
+    if 'budget_hours' in rows:
+        budget = pd.to_numeric(rows['budget_hours'], errors='coerce')
+        reject(rows['budget_hours'].notna() & budget.isna(), "budget_hours is not a number")
+        rows['budget_hours'] = budget.astype(float).astype(object).where(budget.notna(), None)  # whole numbers would parse as int and never match the stored REAL
+    if 'status' in rows:
+        rows['status'] = rows['status'].fillna("Planning")
+        reject(~rows['status'].isin(PROJECT_STATUS_OPTIONS), "unknown status")
+    if 'priority' in rows:
+        rows['priority'] = rows['priority'].fillna("Medium")
+        reject(~rows['priority'].isin(PROJECT_PRIORITIES), "unknown priority")
+    if 'assigned_members' in rows:
+        rows['assigned_members'] = rows['assigned_members'].fillna("").str.split(",").map(lambda xs: json.dumps(sorted({x.strip() for x in xs if x.strip()}), separators=(",", ":"), ensure_ascii=False))
+
+    bad = reasons != ""
+    return rows[~bad].reset_index(drop=True), df[bad].assign(reason=reasons[bad])
+
+@instrumented
+def diff_project_import(rows):
+    """Dry run: classify normalized rows as insert/update/unchanged against the database in one query.
+
+    Adds action, changes (the columns that would change) and old_status columns to a copy of rows.
+    """
+    conn = get_db_connection()
+    existing = pd.read_sql_query(QUERIES['projects_by_code'], conn, params=(json.dumps(rows['project_code'].tolist()),))
+    conn.close()
+    cols = [c for c in rows.columns if c != 'project_code']
+    merged = rows.merge(existing, on='project_code', how='left', suffixes=('', '_db'), indicator=True)
+    def as_text(col): return col.astype(object).where(col.notna(), None).map(lambda v: "" if v is None or v == "[]" else str(v))
+    changed = pd.DataFrame({c: as_text(merged[c]) != as_text(merged[f"{c}_db"]) for c in cols}, index=merged.index)
+    out = rows.copy()
+    out['changes'] = changed.apply(lambda r: ", ".join(changed.columns[r.values]), axis=1) if cols else ""
+    out['action'] = "insert"
+    out.loc[merged['_merge'] == 'both', 'action'] = "update"
+    out.loc[(merged['_merge'] == 'both') & (out['changes'] == ""), 'action'] = "unchanged"
+    out['old_status'] = merged['status_db'] if 'status_db' in merged else None
+    return out
+
+@instrumented
+def apply_project_import(rows, user_name="Bulk Import"):
+    """Upsert normalized rows and their history in one transaction. Returns (inserted, updated)."""
+    diff = diff_project_import(rows)
+    todo = diff[diff['action'] != "unchanged"]
+    if todo.empty: return 0, 0
+    cols = [c for c in rows.columns if c != 'assigned_members']
+    updates = ", ".join(f"{c}=excluded.{c}" for c in cols if c != 'project_code')
+    sql = (f"INSERT INTO projects ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+           f"ON CONFLICT(project_code) DO UPDATE SET {updates}{', ' if updates else ''}updated_at=CURRENT_TIMESTAMP")
+    conn = get_db_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(sql, todo[cols].itertuples(index=False, name=None))
+        ids = dict(conn.execute(QUERIES['project_ids_by_code'], (json.dumps(todo['project_code'].tolist()),)).fetchall())
+        if 'assigned_members' in rows:
+            set_project_members(conn.cursor(), {ids[code]: names for code, names in zip(todo['project_code'], todo['assigned_members'])})
+        history = []
+        for r in todo.itertuples(index=False):
+            if r.action == "insert":
+                history.append((ids[r.project_code], "Created", user_name, f"Project created: {r.project_name}"))
+            elif 'status' in cols and r.status != r.old_status:
+                history.append((ids[r.project_code], "Status Change", user_name, f"Status: {r.old_status} -> {r.status}"))
+        conn.executemany("INSERT INTO project_updates (project_id, update_type, user_name, update_text) VALUES (?,?,?,?)", history)
+        conn.commit()
+    finally: conn.close()
+    return int((todo['action'] == "insert").sum()), int((todo['action'] == "update").sum())
+
+# --- Milestones & Reports ---
+
+@cached_query("project_milestones")
+def get_milestones(pid):
+    conn = get_db_connection()
+    df = pd.read_sql_query(QUERIES['milestones'], conn, params=(pid,))
+    conn.close()
+    return df
+
+@instrumented
+def upsert_milestone(data):
+    conn = get_db_connection()
+    if data.get('id'):
+        conn.execute("UPDATE project_milestones SET group_name=?, milestone_name=?, percent_complete=?, start_date=?, end_date=?, comments=?, status=? WHERE id=?",
+                     (data['group_name'], data['milestone_name'], data['percent_complete'], data['start_date'], data['end_date'], data['comments'], data['status'], data['id']))
+    else:
+        conn.execute("INSERT INTO project_milestones (project_id, group_name, milestone_name, percent_complete, start_date, end_date, comments, status) VALUES (?,?,?,?,?,?,?,?)",
+                     (data['project_id'], data['group_name'], data['milestone_name'], data['percent_complete'], data['start_date'], data['end_date'], data['comments'], data['status']))
+    conn.commit()
+    conn.close()
+
+@instrumented
+def delete_milestone(mid):
+    conn = get_db_connection()
+    conn.execute("DELETE FROM project_milestones WHERE id=?", (mid,))
+    conn.commit()
+    conn.close()
+
+@cached_query("project_milestones")
+def get_milestones_for_projects(pids):
+    """Milestones of all pids in one query, ordered by project then start date."""
+    conn = get_db_connection()
+    df = pd.read_sql_query(QUERIES['milestones_for_projects'], conn, params=(json.dumps([int(p) for p in pids]),))
+    conn.close()
+    return df
+
+@cached_query("status_reports")
+def get_latest_status_report(pid):
+    conn = get_db_connection()
+    df = pd.read_sql_query(QUERIES['latest_status_report'], conn, params=(pid,))
+    conn.close()
+    return df.iloc[0] if not df.empty else None
+
+@cached_query("status_reports")
+def get_latest_status_reports(pids):
+    """Latest status report for each of pids, fetched with a single windowed query."""
+    conn = get_db_connection()
+    df = pd.read_sql_query(QUERIES['latest_status_reports'], conn, params=(json.dumps([int(p) for p in pids]),))
+    conn.close()
+    return df.drop(columns='rn')
+
+@instrumented
+def create_status_report(data):
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute('''INSERT INTO status_reports (project_id, report_date, next_report_date, health_scope, health_schedule, health_budget, health_resources, health_quality, health_overall, executive_summary, accomplishments, next_steps)
+                 VALUES (?,?,?,?,?,?,?,?,?,?,?,?)''',
+              (data['project_id'], data['report_date'], data['next_report_date'], data['health_scope'], data['health_schedule'], data['health_budget'], 
+               data['health_resources'], data['health_quality'], data['health_overall'], data['executive_summary'], data['accomplishments'], data['next_steps']))
+    log_project_update(c, data['project_id'], "Status Report", "System", "New formal status report published")
+    conn.commit()
+    conn.close()
+
+# --- Common Access ---
+def log_project_update(cursor, pid, utype, user, text):
+    cursor.execute("INSERT INTO project_updates (project_id, update_type, user_name, update_text) VALUES (?,?,?,?)", (pid, utype, user, text))
+
+@instrumented
+def add_status_update(pid, user, text):
+    conn = get_db_connection()
+    c = conn.cursor()
+    log_project_update(c, pid, "Status Update", user, text)
+    conn.commit()
+    conn.close()
+
+HISTORY_PAGE_ROWS = 50
+
+@cached_query("project_updates")
+def get_project_history(pid, update_type=None, before=None, limit=HISTORY_PAGE_ROWS):
+    """One page of a project's history, newest first, optionally of a single update_type.
+
+    before is the (created_at, id) cursor returned with the previous page. Returns
+    (page, cursor), where cursor is None once there are no older entries.
+    """
+    key, params = "project_history", [int(pid)]
+    if update_type: key, params = key + "_typed", params + [update_type]
+    if before: key, params = key + "_before", params + [before[0], int(before[1])]
+    conn = get_db_connection()
+    df = pd.read_sql_query(QUERIES[key], conn, params=params + [limit + 1])
+    conn.close()
+    if len(df) <= limit: return df, None
+    df = df.iloc[:limit]
+    return df, (df['created_at'].iloc[-1], int(df['id'].iloc[-1]))
+
+@cached_query("project_updates")
+def get_project_history_types(pid):
+    conn = get_db_connection()
+    types = [r[0] for r in conn.execute(QUERIES['project_history_types'], (int(pid),))]
+    conn.close()
+    return types
+
+@instrumented
+def log_time_entry(data):
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute("INSERT INTO time_logs (project_id, user_id, date, hours, description, category) VALUES (?,?,?,?,?,?)",
+              (data['project_id'], data['user_id'], data['date'], data['hours'], data['description'], data['category']))
+    c.execute("SELECT name FROM users WHERE id=?", (data['user_id'],))
+    res = c.fetchone()
+    uname = res['name'] if res else "Unknown"
+    log_project_update(c, data['project_id'], "Time Logged", uname, f"{data['hours']}h logged: {data['description']}")
+    c.execute("""INSERT INTO time_rollup_daily (project_id, user_id, date, hours, entries) VALUES (?,?,?,?,1)
+                 ON CONFLICT DO UPDATE SET hours = hours + excluded.hours, entries = entries + 1""",
+              (data['project_id'], data['user_id'], data['date'], data['hours']))
+    c.execute(f"""INSERT INTO time_rollup_weekly (project_id, category, week, hours, entries) VALUES (?,?,{TIME_ROLLUP_WEEK.format('?')},?,1)
+                  ON CONFLICT DO UPDATE SET hours = hours + excluded.hours, entries = entries + 1""",
+              (data['project_id'], data['category'] or '', data['date'], data['hours']))
+    conn.commit()
+    conn.close()
+
+@instrumented
+def rebuild_time_rollups():
+    """Recompute the time-log rollup tables from time_logs (after a backfill or direct SQL edits)."""
+    conn = get_db_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        _rebuild_time_rollups(conn.cursor())
+        # The rollups are derived from time_logs and cached under its version.
+        conn.execute("UPDATE data_versions SET version = version + 1 WHERE name = 'time_logs'")
+        conn.commit()
+        return conn.execute("SELECT (SELECT COUNT(*) FROM time_rollup_daily), (SELECT COUNT(*) FROM time_rollup_weekly)").fetchone()
+    finally: conn.close()
+
+@cached_query("time_logs", "users", "projects")
+def get_time_logs(pid=None):
+    conn = get_db_connection()
+    if pid: df = pd.read_sql_query(QUERIES['time_logs_by_project'], conn, params=(pid,))
+    else: df = pd.read_sql_query(QUERIES['time_logs'], conn)
+    conn.close()
+    return df
+
+@cached_query("time_logs", "projects")
+def get_user_time_logs(uid, limit=5):
+    """A user's most recent time entries, newest first."""
+    conn = get_db_connection()
+    df = pd.read_sql_query(QUERIES['user_time_logs'], conn, params=(int(uid), limit))
+    conn.close()
+    return df
+
+@cached_query("time_logs", "projects")
+def get_user_hours(uid):
+    """Total hours and number of entries a user has logged."""
+    conn = get_db_connection()
+    try: return dict(conn.execute(QUERIES['user_hours'], (int(uid),)).fetchone())
+    finally: conn.close()
+
+def _incident_upsert_sql(cols):
+    """INSERT for the given columns that updates the existing ticket when the INC# is already on file."""
+    updates = ", ".join(f"{k}=excluded.{k}" for k in cols if k != 'inc_number')
+    return (f"INSERT INTO incidents ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+            f"ON CONFLICT(inc_number) WHERE {INCIDENT_KEYED} DO {'UPDATE SET ' + updates if updates else 'NOTHING'}")
+
+@instrumented
+def save_incident(data, id=None):
+    """Update an incident by id, or insert a new one. A new INC# already on file is never overwritten
+    (imports upsert through _incident_upsert_sql instead). Returns None on success, else the error message."""
+    if not data.get('inc_number'): return "INC# is required."
+    conn = get_db_connection()
+    c = conn.cursor()
+    for d in INCIDENT_DATE_COLUMNS:
+        if data.get(d) == "": data[d] = None
+    try:
+        if id:
+            set_c = ', '.join([f"{k}=?" for k in data.keys()])
+            c.execute(f"UPDATE incidents SET {set_c} WHERE id=?", list(data.values()) + [int(id)])
+        else:
+            cols = list(data.keys())
+            c.execute(f"INSERT INTO incidents ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) ON CONFLICT(inc_number) WHERE {INCIDENT_KEYED} DO NOTHING",
+                      list(data.values()))
+            if c.rowcount == 0: return f"INC# {data['inc_number']} already exists."
+        conn.commit()
+        return None
+    except sqlite3.IntegrityError as e:
+        print(f"Error saving incident: {e}")
+        return "That INC# already belongs to another incident."
+    finally: conn.close()
+
+@cached_query("incidents")
+def get_incidents():
+    conn = get_db_connection()
+    df = pd.read_sql_query(QUERIES['incidents'], conn)
+    conn.close()
+    return df
+
+@cached_query("incidents")
+def get_incident(iid):
+    conn = get_db_connection()
+    res = conn.execute(QUERIES['incident'], (int(iid),)).fetchone()
+    conn.close()
+    return dict(res) if res else None
+
+@cached_query("incidents")
+def get_incident_metrics():
+    """Dashboard header counts from one GROUP BY over the status/assignee index.
+
+    Returns total, active (not Resolved/Closed) and unassigned active counts, plus by_status
+    (all incidents) and by_assignee (active incidents) as {name: count} dicts.
+    """
+    conn = get_db_connection()
+    try: rows = conn.execute(QUERIES['incident_counts']).fetchall()
+    finally: conn.close()
+    m = {"total": 0, "active": 0, "unassigned": 0, "by_status": {}, "by_assignee": {}}
+    for status, assignee, n in rows:
+        m["total"] += n
+        m["by_status"][status] = m["by_status"].get(status, 0) + n
+        if status in INCIDENT_CLOSED_STATUSES: continue
+        m["active"] += n
+        m["by_assignee"][assignee] = m["by_assignee"].get(assignee, 0) + n
+    m["unassigned"] = m["by_assignee"].get("Unassigned", 0)
+    return m
+
+@cached_query("incidents")
+def get_incident_aging(as_of, by="issue_type", start=None, end=None):
+    """Aging/SLA percentiles per group (one of INCIDENT_AGING_GROUPS) for tickets created in [start, end].
+
+    One row per (group, metric) with incidents, mean, p50/p90/p95 (nearest rank), max and
+    within_sla. Metrics are days_to_receive, days_to_escalate and, for active incidents, open_age
+    on as_of. Tickets without a date_ticket_created are not counted.
+    """
+    if by not in INCIDENT_AGING_GROUPS: raise ValueError(f"Unknown aging group: {by}")
+    conn = get_db_connection()
+    df = pd.read_sql_query(QUERIES[f"incident_aging_{by}"], conn, params=(_iso_date(as_of), _iso_date(start), _iso_date(end)))
+    conn.close()
+    return df.rename(columns={"grp": by})
+
+def _incident_filter(statuses=None, assignees=None):
+    """WHERE conditions and params for the status/assignee filters; empty lists mean no filter."""
+    conds, params = [], []
+    if statuses:
+        conds.append("status IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(list(statuses)))
+    if assignees:
+        conds.append(f"{INCIDENT_ASSIGNEE_EXPR} IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(list(assignees)))
+    return conds, params
+
+@cached_query("incidents")
+def get_incident_page(statuses=None, assignees=None, after=None, limit=INCIDENT_PAGE_SIZE, columns=None):
+    """One keyset page of filtered incidents, newest first.
+
+    after is the (created_at, id) of the previous page's last row. Returns (page, next_cursor);
+    next_cursor is None on the last page. columns defaults to the Dashboard list columns.
+    """
+    conds, params = _incident_filter(None, assignees)
+    if after:
+        conds.append("(created_at, id) < (?, ?)")
+        params += [after[0], int(after[1])]
+    cols = columns or f"id, inc_number, status, {INCIDENT_ASSIGNEE_EXPR} AS assigned_bts_member, title, date_ticket_created, {', '.join(INCIDENT_DURATIONS)}, created_at"
+    order = "ORDER BY created_at DESC, id DESC LIMIT ?"
+    if statuses:
+        # SQLite cannot keep index order across an IN list, so walk ix_incidents_status_created once
+        # per status, each stopping at the page size, and merge the few rows that come back.
+        statuses = list(dict.fromkeys(statuses))
+        part = f"SELECT * FROM (SELECT {cols} FROM incidents WHERE {' AND '.join(['status = ?'] + conds)} {order})"
+        sql = f"SELECT * FROM ({' UNION ALL '.join([part] * len(statuses))}) {order}"
+        params = [p for st in statuses for p in [st, *params, limit + 1]]
+    else: sql = f"SELECT {cols} FROM incidents{' WHERE ' + ' AND '.join(conds) if conds else ''} {order}"
+    conn = get_db_connection()
+    df = pd.read_sql_query(sql, conn, params=params + [limit + 1])
+    conn.close()
+    if len(df) <= limit: return df, None
+    df = df.iloc[:limit]
+    return df, (df.iloc[-1]['created_at'], int(df.iloc[-1]['id']))
+
+@cached_query("incidents")
+def get_incident_ids(statuses=None, assignees=None):
+    """Ids of every incident matching the filters, read from the index only."""
+    conds, params = _incident_filter(statuses, assignees)
+    conn = get_db_connection()
+    ids = [r[0] for r in conn.execute(f"SELECT id FROM incidents{' WHERE ' + ' AND '.join(conds) if conds else ''}", params)]
+    conn.close()
+    return ids
+
+@cached_query("incidents")
+def search_incidents(term, limit=200):
+    """Full-text incident search, best matches first; every word is matched as a prefix.
+
+    A term that looks like a ticket number or MRN (digits, optionally INC-prefixed) also matches
+    anywhere inside inc_number and as a prefix of mrn; those hits come first.
+    """
+    words = re.findall(r"\w+", term or "")
+    match = " ".join(f'"{w}"*' for w in words)
+    conn = get_db_connection()
+    if match: df = pd.read_sql_query(QUERIES['incident_search'], conn, params=(match, limit))
+    else: df = pd.read_sql_query(QUERIES['incidents'] + " LIMIT 0", conn)
+    number = (term or "").strip()
+    if re.fullmatch(r"(?i)(inc)?\d{3,}", number):
+        hits = [pd.read_sql_query(QUERIES['incident_number_search'], conn, params=(f"%{number}%", limit)),
+                pd.read_sql_query(QUERIES['incident_search'], conn, params=(f'mrn : "{number}"*', limit))]
+        df = pd.concat(hits + [df]).drop_duplicates("id").head(limit).reset_index(drop=True)
+    conn.close()
+    return df
+
+@instrumented
+def delete_records(table, ids):
+    if not ids: return
+    conn = get_db_connection()
+    conn.execute(f"DELETE FROM {table} WHERE id IN (SELECT value FROM json_each(?))", (json.dumps([int(i) for i in ids]),))
+    conn.commit()
+    conn.close()
+
+@instrumented
+def update_bulk_incidents(ids, updates):
+    if not ids or not updates: return
+    conn = get_db_connection()
+    parts = [f"{k}=?" for k in updates.keys()]
+    conn.execute(f"UPDATE incidents SET {', '.join(parts)} WHERE id IN (SELECT value FROM json_each(?))", list(updates.values()) + [json.dumps([int(i) for i in ids])])
+    conn.commit()
+    conn.close()
+
+# Columns the Grid editor may change; everything else in the grid is read-only.
+INCIDENT_GRID_COLUMNS = ['title', 'status', 'priority', 'assigned_bts_member', 'issue_type', 'source_category', 'workaround', 'bts_notes', 'resolution']
+
+def diff_incident_grid(original, edited):
+    """Cells of INCIDENT_GRID_COLUMNS that differ between two frames of the same incidents (matched by id).
+
+    Blank and missing compare equal. Returns {column: [(new, id, old), ...]}, omitting unchanged columns.
+    """
+    ed = edited.set_index('id').reindex(original['id'])
+    changes = {}
+    for col in INCIDENT_GRID_COLUMNS:
+        if col not in original or col not in ed: continue
+        rows = [(n, int(i), o) for i, o, n in zip(original['id'], _blank_to_none(original[col]), _blank_to_none(ed[col].reset_index(drop=True))) if o != n]
+        if rows: changes[col] = rows
+    return changes
+
+@instrumented
+def apply_incident_grid(changes):
+    """Write diff_incident_grid() changes in one transaction, one executemany per column.
+
+    A cell is only written if it still holds the value the grid was loaded with, so concurrent
+    edits are not overwritten. Returns (updated, conflicts).
+    """
+    bad = set(changes) - set(INCIDENT_GRID_COLUMNS)
+    if bad: raise ValueError(f"Not editable in the grid: {', '.join(sorted(bad))}")
+    updated = total = 0
+    conn = get_db_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for col, rows in changes.items():
+            updated += conn.executemany(f"UPDATE incidents SET {col} = ? WHERE id = ? AND NULLIF(TRIM({col}), '') IS ?", rows).rowcount
+            total += len(rows)
+        conn.commit()
+    finally: conn.close()
+    return updated, total - updated
+
+# --- Bulk Incident Import ---
+def sniff_csv_encoding(f):
+    """'utf-8' if the whole upload decodes as UTF-8, else 'cp1252' (Excel's export default); reads in 1 MB blocks."""
+    dec = codecs.getincrementaldecoder("utf-8")()
+    try:
+        for block in iter(lambda: f.read(1 << 20), b""): dec.decode(block)
+        dec.decode(b"", final=True)
+        return "utf-8"
+    except UnicodeDecodeError: return "cp1252"
+    finally: f.seek(0)
+
+def normalize_incident_chunk(chunk):
+    """Known columns with blanks as None and ISO dates. Returns (rows, rejected-with-reason)."""
+    chunk = chunk.rename(columns=lambda c: str(c).strip())
+    rows = pd.DataFrame({c: _blank_to_none(chunk[c]) for c in INCIDENT_IMPORT_COLUMNS if c in chunk.columns}, index=chunk.index)
+    reasons = pd.Series("", index=chunk.index)
+    if 'inc_number' not in rows: rows['inc_number'] = None
+    reasons[rows['inc_number'].isna()] = "missing inc_number"
+    for col in INCIDENT_DATE_COLUMNS:
+        if col not in rows: continue
+        parsed = pd.to_datetime(rows[col], errors='coerce', format='mixed')
+        reasons[rows[col].notna() & parsed.isna() & (reasons == "")] = f"unreadable {col}"
+        rows[col] = parsed.dt.strftime('%Y-%m-%d').astype(object).where(parsed.notna(), None)
+    bad = reasons != ""
+    return rows[~bad], chunk[bad].assign(reason=reasons[bad])
+
+@instrumented
+def import_incidents_csv(f, chunksize=IMPORT_CHUNK_ROWS, progress=None, max_rejected=1000):
+    """Stream an incident CSV into the database, one transaction per chunk, upserting on inc_number.
+
+    Memory stays at one chunk regardless of file size. progress(rows_done, fraction) is called
+    after each chunk. Returns a dict with rows, inserted, updated and rejected counts, plus
+    rejected_rows (the first max_rejected bad rows with a reason) and ignored_columns.
+    """
+    encoding = sniff_csv_encoding(f)
+    size = f.seek(0, 2) or 1
+    f.seek(0)
+    result = {"rows": 0, "inserted": 0, "updated": 0, "rejected": 0, "ignored_columns": [], "rejected_rows": []}
+    kept = 0  # rejected rows held in rejected_rows, capped at max_rejected
+    conn = get_db_connection()
+    try:
+        # Only empty cells are missing: "NA" is a placeholder ticket number here, not a null.
+        for chunk in pd.read_csv(f, chunksize=chunksize, dtype=str, encoding=encoding, keep_default_na=False, na_values=[""]):
+            if not result["rows"] and not result["rejected"]:
+                result["ignored_columns"] = [c for c in chunk.columns if str(c).strip() not in INCIDENT_IMPORT_COLUMNS]
+            rows, bad = normalize_incident_chunk(chunk)
+            result["rejected"] += len(bad)
+            if kept < max_rejected and len(bad):
+                result["rejected_rows"].append(bad.head(max_rejected - kept))
+                kept += len(result["rejected_rows"][-1])
+            if not rows.empty:
+                numbers = rows['inc_number'].drop_duplicates().tolist()
+                known = {r[0] for r in conn.execute(QUERIES['incident_numbers'], (json.dumps(numbers),))}
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(_incident_upsert_sql(list(rows.columns)), rows.itertuples(index=False, name=None))
+                conn.commit()
+                keyed = ~rows['inc_number'].str.upper().isin(INCIDENT_PLACEHOLDERS)
+                updated = int((rows['inc_number'].isin(known) | (keyed & rows['inc_number'].duplicated())).sum())
+                result["updated"] += updated
+                result["inserted"] += len(rows) - updated
+            result["rows"] += len(chunk)
+            if progress: progress(result["rows"], min(f.tell() / size, 1.0))
+    finally: conn.close()
+    result["rejected_rows"] = pd.concat(result["rejected_rows"]) if result["rejected_rows"] else pd.DataFrame()
+    return result
+
+# --- Analytics ---
+# Hours breakdowns, computed in SQL over the time-log rollups. Dates are 'YYYY-MM-DD' strings or
+# date objects; None leaves that end of the range open.
+ANALYTICS_BREAKDOWNS = ("project", "person", "category", "week", "month")
+ANALYTICS_BURN_WINDOW_DAYS = 28
+
+def _iso_date(d):
+    return d.isoformat() if hasattr(d, 'isoformat') else d
+
+@cached_query("time_logs", "users", "projects")
+def get_hours_totals(start=None, end=None):
+    """Total hours, contributors and projects with time logged in the range."""
+    conn = get_db_connection()
+    try: return dict(conn.execute(QUERIES['hours_totals'], (_iso_date(start), _iso_date(end))).fetchone())
+    finally: conn.close()
+
+@cached_query("time_logs", "users", "projects")
+def get_hours_breakdown(by, start=None, end=None):
+    """Hours grouped by one of ANALYTICS_BREAKDOWNS within the date range."""
+    if by not in ANALYTICS_BREAKDOWNS: raise ValueError(f"Unknown breakdown: {by}")
+    name = f"hours_by_{by}"
+    params = (_iso_date(start), _iso_date(end))
+    if by == "category":
+        if start is None and end is None: params = ()
+        else: name = "hours_by_category_range"
+    conn = get_db_connection()
+    df = pd.read_sql_query(QUERIES[name], conn, params=params)
+    conn.close()
+    return df
+
+@cached_query("time_logs", "users", "projects")
+def get_budget_burn(as_of, window_days=ANALYTICS_BURN_WINDOW_DAYS):
+    """Per project: budget, hours logged up to `as_of`, remaining hours, % burned, burn rate (h/week) and weeks left at that rate."""
+    conn = get_db_connection()
+    df = pd.read_sql_query(QUERIES['budget_burn'], conn, params=(_iso_date(as_of), int(window_days), int(window_days), _iso_date(as_of)))
+    conn.close()
+    return df
+
+# --- Exports ---
+EXPORT_CHUNK_ROWS = 10000
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "athelas-exports")
+# Display name -> (file stem, query). Rows are streamed from SQLite in EXPORT_CHUNK_ROWS chunks.
+EXPORTS = {
+    "Incidents": ("incidents", "SELECT * FROM incidents ORDER BY id"),
+    "Projects": ("projects", """SELECT id, project_name, project_code, description, project_manager, business_owner, executive_sponsor,
+                                COALESCE((SELECT group_concat(user_name, ', ') FROM (SELECT user_name FROM project_members m WHERE m.project_id = p.id ORDER BY user_name)), '') AS assigned_members,
+                                status, start_date, target_end_date, actual_end_date, budget_hours, priority, created_at, updated_at
+                                FROM projects p ORDER BY created_at DESC"""),
+    "Time Logs": ("timelogs", QUERIES['time_logs']),
+    "Users": ("users", "SELECT * FROM users ORDER BY name"),
+    "Project History": ("project_history", "SELECT * FROM project_updates ORDER BY id"),
+}
+
+def export_formats():
+    """Formats offered for export; Parquet only when pyarrow is installed."""
+    fmts = {"CSV": ".csv", "CSV (gzip)": ".csv.gz"}
+    if importlib.util.find_spec("pyarrow"): fmts["Parquet"] = ".parquet"
+    return fmts
+
+def iter_export_chunks(name, chunksize=EXPORT_CHUNK_ROWS):
+    conn = get_db_connection()
+    try: yield from pd.read_sql_query(EXPORTS[name][1], conn, chunksize=chunksize)
+    finally: conn.close()
+
+def _write_csv(chunks, out):
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='')
+    for i, chunk in enumerate(chunks): chunk.to_csv(text, index=False, header=(i == 0))
+    text.flush()
+    text.detach()
+
+def _write_parquet(chunks, out):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            # All-NULL columns in the first chunk carry no type; store them as text.
+            schema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in table.schema])
+            writer = pq.ParquetWriter(out, schema.remove_metadata())
+        writer.write_table(table.cast(writer.schema))
+    if writer: writer.close()
+
+def write_export(name, fmt, out):
+    """Stream one EXPORTS table into the binary file object out in the given export_formats() format."""
+    chunks = iter_export_chunks(name)
+    if fmt == "Parquet": _write_parquet(chunks, out)
+    elif fmt == "CSV (gzip)":
+        with gzip.GzipFile(fileobj=out, mode='wb') as gz: _write_csv(chunks, gz)
+    else: _write_csv(chunks, out)
+
+@instrumented
+def export_file_name(name, fmt):
+    """Download name for an export of a table, or None for the zip of every table."""
+    return "athelas_export.zip" if name is None else EXPORTS[name][0] + export_formats()[fmt]
+
+def export_to_file(name, fmt):
+    """Write an export (a table, or None for a zip of every table) to a temp file. Returns (path, file name)."""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    for old in os.listdir(EXPORT_DIR):  # prune exports nobody downloaded
+        old = os.path.join(EXPORT_DIR, old)
+        if time.time() - os.path.getmtime(old) > 3600: os.remove(old)
+    ext = export_formats()[fmt]
+    fd, path = tempfile.mkstemp(suffix=".zip" if name is None else ext, dir=EXPORT_DIR)
+    with os.fdopen(fd, 'wb') as out:
+        if name is not None:
+            write_export(name, fmt, out)
+            return path, export_file_name(name, fmt)
+        with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for table, (stem, _) in EXPORTS.items():
+                with zf.open(stem + ext, 'w', force_zip64=True) as member:
+                    if fmt == "Parquet":  # the Parquet writer needs a seekable file
+                        with tempfile.TemporaryFile() as tmp:
+                            write_export(table, fmt, tmp)
+                            tmp.seek(0)
+                            shutil.copyfileobj(tmp, member)
+                    else: write_export(table, fmt, member)
+    return path, export_file_name(None, fmt)
+
+# --- Status Rollup ---
+HEALTH_FIELDS = [("Scope", "health_scope"), ("Schedule", "health_schedule"), ("Budget", "health_budget"),
+                 ("Resources", "health_resources"), ("Quality", "health_quality"), ("OVERALL", "health_overall")]
+
+def status_card_payload(proj, latest, milestones):
+    """Plain-data content of one status card, independent of Streamlit so it can be cached."""
+    return {
+        "title": f"{proj['project_name']} ({proj['project_code']})",
+        "health": [(label, latest[col]) for label, col in HEALTH_FIELDS],
+        "roles": [("Project Manager", proj['project_manager'] or '-'),
+                  ("Business Process Owner", proj['business_owner'] or '-'),
+                  ("Executive Sponsor", proj['executive_sponsor'] or '-')],
+        "milestones": milestones[['milestone_name', 'percent_complete', 'start_date', 'end_date', 'comments']].copy() if not milestones.empty else None,
+        "executive_summary": latest['executive_summary'] or "No summary.",
+        "accomplishments": latest['accomplishments'] or "-",
+        "next_steps": latest['next_steps'] or "-",
+        "report_date": latest['report_date'],
+        "next_report_date": latest['next_report_date'],
+    }
+
+@functools.cache
+def _status_card_cache():
+    return {}  # project id -> (payload key, payload)
+
+# The briefing worker and script threads share the card cache.
+_status_card_lock = threading.Lock()
+
+@instrumented
+def load_status_rollup(active_projs, latest=None):
+    """Card payloads for every active project that has a report, in active_projs order.
+
+    Costs two queries (latest reports, then milestones for the cards not already built).
+    Payloads are memoized per project under (report id, milestone data version, project updated_at),
+    so regenerating an unchanged briefing reads only the latest-report ids and one counter; a
+    project's entry is replaced when its key changes and dropped once it is no longer active.
+    Pass latest (from get_latest_status_reports) to share it with the overview table.
+    """
+    if active_projs.empty: return []
+    if latest is None: latest = get_latest_status_reports(active_projs['id'].tolist())
+    latest = latest.set_index('project_id')
+    ms_version, = get_data_versions("project_milestones")
+    projs = active_projs.set_index('id')
+    keys = {pid: (int(rep['id']), ms_version, str(projs.at[pid, 'updated_at'])) for pid, rep in latest.iterrows()}
+
+    cache = _status_card_cache()
+    with _status_card_lock:
+        for pid in [p for p in cache if p not in keys]: del cache[pid]
+        cards = {pid: cache[pid][1] for pid, key in keys.items() if pid in cache and cache[pid][0] == key}
+    missing = [pid for pid in keys if pid not in cards]
+    if missing:
+        ms = get_milestones_for_projects(missing)
+        by_project = {pid: grp for pid, grp in ms.groupby('project_id')}
+        for pid in missing:
+            cards[pid] = status_card_payload(projs.loc[pid], latest.loc[pid], by_project.get(pid, ms.iloc[0:0]))
+        with _status_card_lock:
+            for pid in missing: cache[pid] = (keys[pid], cards[pid])
+    return [cards[pid] for pid in active_projs['id'] if pid in keys]
+
+def project_overview_frame(active_projs, latest):
+    """One row per active project for the briefing's high-level overview table."""
+    status = active_projs['id'].map(latest.set_index('project_id')['health_overall']).fillna("Not Started")
+    codes = active_projs['project_code'].fillna("")
+    team_codes = codes.str.split('-').str[0].where(codes.str.contains('-', regex=False), "UNK")
+    return pd.DataFrame({
+        "Alert": status.map(HEALTH_COLORS).fillna("⚪"),
+        "Project Name": active_projs['project_name'],
+        "Project Lead": active_projs['project_manager'],
+        "Project Team": team_codes.map(TEAMS).fillna(team_codes),
+        "Status": status,
+        "Frequency": "Biweekly",
+        "Project ETC": active_projs['target_end_date'],
+    })
+
+# --- Briefing ---
+# The Executive Status Briefing is rendered off the script thread into a self-contained HTML
+# file named after the report-set version, so it is built once per change and served as-is.
+BRIEFING_DIR = os.path.join(tempfile.gettempdir(), "athelas-briefings")
+BRIEFING_WORKERS = 1
+BRIEFING_KEEP = 5
+BRIEFING_CSS = """
+body { font-family: -apple-system, "Segoe UI", Helvetica, Arial, sans-serif; color: #262730; margin: 2rem; }
+h1 { margin-bottom: 0.2rem; } .meta { color: #808495; margin-bottom: 1.5rem; }
+table { border-collapse: collapse; width: 100%; font-size: 0.9rem; }
+th, td { border: 1px solid #e6e9ef; padding: 0.35rem 0.5rem; text-align: left; vertical-align: top; }
+th { background: #f0f2f6; }
+.card { border: 1px solid #d6d9e0; border-radius: 0.5rem; padding: 1rem 1.25rem; margin: 1.5rem 0; }
+.row { display: flex; gap: 1.5rem; } .row > div { flex: 1; }
+.split { display: flex; gap: 1.5rem; } .split > .left { flex: 2; } .split > .right { flex: 1; }
+.summary { background: #e8f1fb; border-radius: 0.4rem; padding: 0.6rem 0.8rem; }
+.text { white-space: pre-wrap; } .caption { color: #808495; font-size: 0.85rem; }
+hr { border: none; border-top: 1px solid #e6e9ef; margin: 0.8rem 0; }
+@media print {
+  body { margin: 0; }
+  .card { page-break-before: always; break-before: page; page-break-inside: avoid; break-inside: avoid; border: none; }
+  table { page-break-inside: avoid; break-inside: avoid; }
+  h3, h4 { page-break-after: avoid; break-after: avoid; }
+}
+"""
+
+def _briefing_card_html(card):
+    e = lambda v: html.escape(str(v))
+    health = "".join(f"<div><b>{e(label)}</b><br>{HEALTH_COLORS.get(val, '⚪')} {e(val)}</div>" for label, val in card['health'])
+    roles = "".join(f"<div><b>{e(label)}:</b> {e(val)}</div>" for label, val in card['roles'])
+    schedule = (card['milestones'].to_html(index=False, na_rep="", border=0) if card['milestones'] is not None
+                else '<p class="caption">No milestones defined.</p>')
+    return f"""<div class="card project-status-card">
+<h3>{e(card['title'])}</h3>
+<div class="row">{health}</div><hr>
+<div class="row">{roles}</div><hr>
+<div class="split"><div class="left"><h4>Schedule</h4>{schedule}</div>
+<div class="right"><h4>Executive Summary</h4><div class="summary text">{e(card['executive_summary'])}</div>
+<h4>Accomplishments</h4><div class="text">{e(card['accomplishments'])}</div>
+<h4>Next Steps</h4><div class="text">{e(card['next_steps'])}</div></div></div>
+<p class="caption">Report Date: {e(card['report_date'])} | Next Report: {e(card['next_report_date'])}</p>
+</div>"""
+
+def render_briefing_html(active_projs, latest, cards, generated):
+    """The whole briefing (overview table plus one card per project) as a standalone HTML page."""
+    if active_projs.empty: body = "<p>No active projects found.</p>"
+    else:
+        overview = project_overview_frame(active_projs, latest).to_html(index=False, na_rep="", border=0)
+        body = "<h2>📋 High-Level Overview</h2>" + overview + "".join(_briefing_card_html(c) for c in cards)
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Executive Project Status Rollup</title><style>{BRIEFING_CSS}</style></head>
+<body><h1>📅 Executive Project Status Rollup</h1>
+<p class="meta"><b>Generated:</b> {generated:%Y-%m-%d %H:%M}</p>
+{body}
+<p class="caption">End of Report</p>
+</body></html>"""
+
+def briefing_version():
+    """Change token for everything the briefing shows: projects, status reports and milestones."""
+    return get_data_versions("projects", "status_reports", "project_milestones")
+
+def _briefing_dir():
+    """Per-database folder under BRIEFING_DIR: version counters start at 0 in every database."""
+    return os.path.join(BRIEFING_DIR, hashlib.sha1(os.path.abspath(DB_FILE).encode()).hexdigest()[:16])
+
+def _briefing_path(version):
+    return os.path.join(_briefing_dir(), "briefing-" + "-".join(map(str, version)) + ".html")
+
+@functools.cache
+def _briefing_executor():
+    return ThreadPoolExecutor(max_workers=BRIEFING_WORKERS, thread_name_prefix="athelas-briefing")
+
+@functools.cache
+def _briefing_jobs():
+    return {}  # file path -> Future
+
+@instrumented
+def build_briefing(version):
+    """Render the briefing for `version` and write it atomically. Returns the file path."""
+    with get_perf().rerun("background/briefing"):
+        projs = get_projects()
+        active = projs[projs['status'] == 'Active']
+        latest = get_latest_status_reports(active['id'].tolist()) if not active.empty else None
+        cards = load_status_rollup(active, latest)
+        doc = render_briefing_html(active, latest, cards, datetime.now())
+    folder = _briefing_dir()
+    os.makedirs(folder, exist_ok=True)
+    path = _briefing_path(version)
+    fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=folder)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f: f.write(doc)
+    os.replace(tmp, path)
+    old = sorted((os.path.join(folder, n) for n in os.listdir(folder) if n.endswith(".html")), key=os.path.getmtime)
+    for stale in old[:-BRIEFING_KEEP]: os.remove(stale)
+    return path
+
+def latest_briefing(build=True, retry=False):
+    """State of the pre-built briefing, queueing a background build when the current one is missing.
+
+    A failed build is kept (and its error reported) until the data changes or retry is set, rather
+    than being resubmitted on every rerun. Returns a dict: path (newest built file, possibly for an
+    older version, or None), current (path is for the current data), pending (a build is running)
+    and error (from a failed build of the current data).
+    """
+    version = briefing_version()
+    path = _briefing_path(version)
+    jobs = _briefing_jobs()
+    if os.path.exists(path): return {"path": path, "current": True, "pending": False, "error": None}
+    job = jobs.get(path)
+    error = None
+    if job is not None and job.done():
+        if job.exception() is not None and not retry: error = str(job.exception())
+        else: job = None  # failed and retrying, or built but since pruned: build again
+    if job is None and build:
+        for v in [v for v, j in jobs.items() if j.done()]: jobs.pop(v)
+        job = jobs[path] = _briefing_executor().submit(build_briefing, version)
+    folder = _briefing_dir()
+    built = [os.path.join(folder, n) for n in os.listdir(folder) if n.endswith(".html")] if os.path.isdir(folder) else []
+    return {"path": max(built, key=os.path.getmtime) if built else None, "current": False,
+            "pending": job is not None and not job.done(), "error": error}